@@ -0,0 +1,2611 @@
+import re
+import threading
+import queue
+import sys
+import os
+import array
+import bisect
+import collections
+import errno
+import heapq
+import importlib
+import itertools
+import ipaddress
+import math
+import random
+import struct
+import time
+import zlib
+
+class _LazyModule:
+    # Placeholder for a module that only some modes need. The first attribute access imports the real module and
+    # rebinds the global name to it, so later lookups are plain module attribute lookups.
+    def __init__(self, name): self._name = name
+
+    def __getattr__(self, attr):
+        importlib.import_module(self._name); top = self._name.split('.')[0]
+        globals()[top] = sys.modules[top]
+        return getattr(sys.modules[top], attr)
+
+# asyncio (which brings ssl and subprocess with it) alone costs more at startup than the rest of the script, and
+# `--help`, `history` and the GUI's language window never use it; sqlite3 is only loaded for history, csv for CSV
+# output, http.server for --metrics-listen. `bench --startup` measures the result.
+argparse = _LazyModule('argparse'); asyncio = _LazyModule('asyncio'); csv = _LazyModule('csv'); http = _LazyModule('http.server')
+json = _LazyModule('json'); platform = _LazyModule('platform'); secrets = _LazyModule('secrets'); signal = _LazyModule('signal')
+socket = _LazyModule('socket'); sqlite3 = _LazyModule('sqlite3'); ssl = _LazyModule('ssl'); subprocess = _LazyModule('subprocess')
+
+# Child processes (shard workers, isolated bench runs) start through the small launcher script next to this module.
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DNS-CHECK.py')
+
+# maxminddb ships with geoip2; its raw records avoid building full geoip2 model objects per lookup.
+# It is imported by geoip_available() the first time a scanner is set up.
+maxminddb = None
+
+def geoip_available():
+    global maxminddb
+    if maxminddb is None:
+        try: import maxminddb
+        except ImportError: maxminddb = False
+    return maxminddb is not False
+
+# Tk is only imported when the GUI is launched, so headless runs work on machines without a display or Tk.
+tk = ttk = filedialog = messagebox = None
+
+def _load_tk():
+    global tk, ttk, filedialog, messagebox
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+
+# ==============================================================================
+#  Translation Dictionary
+# ==============================================================================
+I18N = {
+    'fa': {
+        "window_title": "IRNET DNS CHECKER PRO",
+        "input_frame": "دی ان اس ورودی",
+        "single_dns_label": "چک کردن تکی DNS:",
+        "single_test_button": "تست تکی",
+        "import_button": "وارد کردن لیست",
+        "start_button": "شروع تست",
+        "pause_button": "توقف",
+        "resume_button": "ادامه",
+        "export_csv_button": "خروجی (CSV)",
+        "export_txt_button": "خروجی (TXT)",
+        "results_frame": "نتایج",
+        "status_ready": "آماده",
+        "status_loaded": "{count} آدرس DNS بارگذاری شد. برای شروع کلیک کنید.",
+        "status_testing": "تست {current} از {total} انجام شد...",
+        "status_paused": "متوقف شد.",
+        "status_done": "تمام عملیات با موفقیت کامل شد!",
+        "status_copied": '"{text}" در کلیپ‌بورد کپی شد.',
+        "col_dns": "آدرس DNS", "col_ping": "پینگ (ms)", "col_loss": "پکت لاست (%)", "col_loc": "موقعیت", "col_isp": "سرویس‌دهنده",
+        "ping_fail": "ناموفق",
+        "ctx_copy_dns": "کپی آدرس DNS", "ctx_copy_ping": "کپی پینگ", "ctx_copy_row": "کپی کل ردیف",
+        "err_title": "خطا", "info_title": "موفق", "warn_title": "خالی",
+        "err_read_file": "مشکلی در خواندن فایل پیش آمد: {e}",
+        "warn_no_results": "هیچ نتیجه‌ای برای خروجی گرفتن وجود ندارد.",
+        "info_export_success": "نتایج با موفقیت ذخیره شد.",
+        "err_export_fail": "مشکلی در ذخیره فایل پیش آمد: {e}",
+        "select_lang_title": "انتخاب زبان / SELECT LANGUAGE",
+        "lang_button_fa": "فارسی", "lang_button_en": "ENGLISH",
+        "file_dialog_txt": "فایل متنی", "file_dialog_csv": "فایل CSV",
+        "save_csv_title": "ذخیره نتایج به عنوان CSV", "save_txt_title": "ذخیره نتایج به عنوان TXT",
+        "geoip_lib_error": "کتابخانه 'geoip2' نصب نیست. لطفاً با دستور 'pip install geoip2' آن را نصب کنید.",
+        "geoip_db_error": "فایل دیتابیس '{db_name}' در کنار برنامه یافت نشد. لطفاً آن را دانلود و در پوشه برنامه قرار دهید.",
+        "probe_icmp": "پینگ ICMP", "probe_dns": "کوئری DNS", "probe_dot": "DNS روی TLS", "probe_doh": "DNS روی HTTPS",
+        "col_rcode": "کد پاسخ", "col_answers": "تعداد پاسخ",
+        "col_connect": "اتصال TCP (ms)", "col_tls": "دست‌دهی TLS (ms)", "col_first_query": "اولین کوئری (ms)",
+        "incremental_check": "فقط تست موارد قدیمی",
+        "status_history_loaded": "{count} نتیجه قبلی بارگذاری شد.",
+        "stats_button": "آمار", "stats_title": "آمار اسکن",
+    },
+    'en': {
+        "window_title": "IRNET DNS CHECKER PRO",
+        "input_frame": "DNS INPUT",
+        "single_dns_label": "SINGLE DNS CHECK:",
+        "single_test_button": "TEST SINGLE",
+        "import_button": "IMPORT LIST",
+        "start_button": "START TEST",
+        "pause_button": "PAUSE",
+        "resume_button": "RESUME",
+        "export_csv_button": "EXPORT (CSV)",
+        "export_txt_button": "EXPORT (TXT)",
+        "results_frame": "RESULTS",
+        "status_ready": "READY",
+        "status_loaded": "{count} DNS ADDRESSES LOADED. CLICK START TO TEST.",
+        "status_testing": "TESTING {current} OF {total}...",
+        "status_paused": "PAUSED.",
+        "status_done": "ALL OPERATIONS COMPLETED SUCCESSFULLY!",
+        "status_copied": 'COPIED "{text}" TO CLIPBOARD.',
+        "col_dns": "DNS ADDRESS", "col_ping": "PING (MS)", "col_loss": "PACKET LOSS (%)", "col_loc": "LOCATION", "col_isp": "SERVICE PROVIDER",
+        "ping_fail": "FAILED",
+        "ctx_copy_dns": "COPY DNS ADDRESS", "ctx_copy_ping": "COPY PING", "ctx_copy_row": "COPY ENTIRE ROW",
+        "err_title": "ERROR", "info_title": "SUCCESS", "warn_title": "EMPTY",
+        "err_read_file": "ERROR READING FILE: {e}",
+        "warn_no_results": "THERE ARE NO RESULTS TO EXPORT.",
+        "info_export_success": "RESULTS EXPORTED SUCCESSFULLY.",
+        "err_export_fail": "AN ERROR OCCURRED WHILE SAVING THE FILE: {e}",
+        "select_lang_title": "SELECT LANGUAGE / انتخاب زبان",
+        "lang_button_fa": "فارسی", "lang_button_en": "ENGLISH",
+        "file_dialog_txt": "TEXT FILE", "file_dialog_csv": "CSV FILE",
+        "save_csv_title": "SAVE RESULTS AS CSV", "save_txt_title": "SAVE RESULTS AS TXT",
+        "geoip_lib_error": "The 'geoip2' library is not installed. Please install it using 'pip install geoip2'.",
+        "geoip_db_error": "The database file '{db_name}' was not found. Please download it and place it in the application's folder.",
+        "probe_icmp": "ICMP PING", "probe_dns": "DNS QUERY", "probe_dot": "DNS OVER TLS", "probe_doh": "DNS OVER HTTPS",
+        "col_rcode": "RCODE", "col_answers": "ANSWERS",
+        "col_connect": "TCP CONNECT (MS)", "col_tls": "TLS HANDSHAKE (MS)", "col_first_query": "FIRST QUERY (MS)",
+        "incremental_check": "ONLY RE-TEST STALE",
+        "status_history_loaded": "{count} LAST KNOWN RESULTS LOADED.",
+        "stats_button": "STATS", "stats_title": "SCAN STATISTICS",
+    }
+}
+
+# ==============================================================================
+#  Background Event Loop
+# ==============================================================================
+class _LoopThread:
+    # One asyncio loop on a daemon thread, shared by every async prober so worker threads can block on it.
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="probe-loop", daemon=True); self._thread.start()
+
+    def submit(self, coro): return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    def run(self, coro, timeout=None): return self.submit(coro).result(timeout)
+
+_loop_thread = None
+_loop_thread_lock = threading.Lock()
+
+def background_loop():
+    global _loop_thread
+    with _loop_thread_lock:
+        if _loop_thread is None: _loop_thread = _LoopThread()
+        return _loop_thread
+
+# ==============================================================================
+#  Metrics & Profiling
+# ==============================================================================
+class Histogram:
+    # Latency histogram over fixed buckets (seconds); cheap enough to observe every probe.
+    BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self): self.counts = [0] * (len(self.BOUNDS) + 1); self.count = 0; self.sum = 0.0
+
+    def observe(self, seconds): self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1; self.count += 1; self.sum += seconds
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the requested rank; None when empty, inf past the last bound.
+        if not self.count: return None
+        rank = fraction * self.count; seen = 0
+        for bound, count in zip(self.BOUNDS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank: return bound
+
+class Metrics:
+    # Process-wide stage histograms, labelled counters and gauges. Gauges are callables read only at export time, so
+    # nothing on the hot path has to keep them up to date.
+    BOUND_LABELS = tuple(repr(bound) for bound in Histogram.BOUNDS) + ('+Inf',)
+
+    def __init__(self):
+        self.lock = threading.Lock(); self.gauges = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock: self.histograms = {}; self.counters = collections.Counter(); self.last_errors = {}; self.started = time.time()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None: histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        with self.lock: self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def error(self, stage, message, always_print=False):
+        # Counted per stage. Unless `always_print`, only the first error of a stage reaches stderr, so one broken
+        # database or socket cannot flood the terminal during a large scan.
+        with self.lock:
+            self.counters[('errors_total', (('stage', stage),))] += 1
+            first = stage not in self.last_errors; self.last_errors[stage] = str(message)
+        if always_print: print(message, file=sys.stderr)
+        elif first: print(f"{message} (further {stage} errors are only counted in the metrics)", file=sys.stderr)
+
+    def gauge(self, name, read): self.gauges[name] = read
+
+    def _gauge_values(self):
+        values = {}
+        for name, read in list(self.gauges.items()):
+            try: values[name] = read()
+            except Exception: pass
+        return values
+
+    def snapshot(self):
+        with self.lock:
+            stages = {stage: {'count': h.count, 'sum_s': round(h.sum, 6), 'p50_s': h.quantile(0.5), 'p95_s': h.quantile(0.95), 'p99_s': h.quantile(0.99)}
+                      for stage, h in self.histograms.items()}
+            counters = {name + ('{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}' if labels else ''): value
+                        for (name, labels), value in sorted(self.counters.items())}
+            errors = dict(self.last_errors)
+        return {'time': time.time(), 'uptime_s': round(time.time() - self.started, 3), 'stages': stages, 'counters': counters,
+                'gauges': self._gauge_values(), 'last_errors': errors}
+
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            for stage, h in sorted(self.histograms.items()):
+                name = f"dnscheck_{stage}_seconds"; lines.append(f"# TYPE {name} histogram"); total = 0
+                for bound, count in zip(self.BOUND_LABELS, h.counts):
+                    total += count; lines.append(f'{name}_bucket{{le="{bound}"}} {total}')
+                lines += [f"{name}_sum {h.sum}", f"{name}_count {h.count}"]
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed: typed.add(name); lines.append(f"# TYPE dnscheck_{name} counter")
+                label_text = '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}' if labels else ''
+                lines.append(f"dnscheck_{name}{label_text} {value}")
+        for name, value in sorted(self._gauge_values().items()): lines += [f"# TYPE dnscheck_{name} gauge", f"dnscheck_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+# Pages served by serve_metrics(): path -> function returning (content type, body). Other modes may add their own.
+HTTP_ROUTES = {
+    '/metrics': lambda: ('text/plain; version=0.0.4; charset=utf-8', METRICS.prometheus()),
+    '/metrics.json': lambda: ('application/json', json.dumps(METRICS.snapshot())),
+}
+
+def serve_metrics(address):
+    # Serves HTTP_ROUTES (Prometheus text at /metrics, the JSON snapshot at /metrics.json) from a daemon thread.
+    host, port = address.rsplit(':', 1)
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            route = HTTP_ROUTES.get(self.path.split('?', 1)[0])
+            if route is None: self.send_error(404); return
+            content_type, body = route(); body = body.encode('utf-8')
+            self.send_response(200); self.send_header('Content-Type', content_type); self.send_header('Content-Length', str(len(body)))
+            self.end_headers(); self.wfile.write(body)
+        def log_message(self, *args): pass
+    server = http.server.ThreadingHTTPServer((host.strip('[]'), int(port)), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+class SnapshotWriter:
+    # Rewrites a JSON metrics snapshot every `interval` seconds (atomically, so readers never see half a file).
+    def __init__(self, path, interval=5.0):
+        self.path = path; self.interval = interval; self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+
+    def start(self): self._thread.start(); return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval): self.write()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(METRICS.snapshot(), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e: METRICS.error('metrics', f"Metrics Error: {e}")
+
+    def stop(self): self._stop.set(); self._thread.join(); self.write()
+
+class SamplingProfiler:
+    # Samples every thread's Python stack each `interval` seconds and writes collapsed stacks ("thread;outer;...;inner
+    # count" per line), the input format of flamegraph.pl and speedscope. Opt-in; costs nothing when not started.
+    def __init__(self, path, interval=0.005):
+        self.path = path; self.interval = interval; self.samples = collections.Counter(); self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self): self._thread.start(); return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own: continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code; stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"); frame = frame.f_back
+                stack.append(names.get(ident, str(ident))); self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set(); self._thread.join()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common(): f.write(f"{stack} {count}\n")
+
+# ==============================================================================
+#  DNS Query Prober
+# ==============================================================================
+DNS_PROBE_NAMES = ('google.com', 'cloudflare.com', 'microsoft.com', 'wikipedia.org')
+DNS_RCODES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+DNS_REFUSING_RCODES = (4, 5)  # NOTIMP, REFUSED: the resolver will not serve us, however often it is asked
+
+# A probe that failed for certain (connection refused, host or network unreachable), as opposed to one that timed out.
+# With short_circuit, only these end a probe early: a lost first query or echo may just be packet loss.
+UNREACHABLE = object()
+
+def definite_failure(error):
+    return isinstance(error, ConnectionRefusedError) or getattr(error, 'errno', None) in (errno.EHOSTUNREACH, errno.ENETUNREACH)
+
+class DNSProbeResult(collections.namedtuple('DNSProbeResult', 'dns_ip latency queries timeouts errors rcode answers')):
+    # `errors` counts replies that came back without resolving anything; they are lost queries as much as timeouts.
+    __slots__ = ()
+    @property
+    def loss(self): return round((self.timeouts + self.errors) * 100 / self.queries) if self.queries else 100
+
+def summarize_replies(replies):
+    # Replies are (latency_ms, rcode, answer_count), or None/UNREACHABLE for a query that got none. Only a NOERROR reply
+    # with at least one answer is a success: REFUSED, SERVFAIL or an empty answer come back fast but resolve nothing,
+    # so they count as lost and stay out of the latency. Returns (latency, errors, rcode name, answers); the rcode is
+    # the first non-NOERROR one seen, and None when nothing answered.
+    answered = [r for r in replies if isinstance(r, tuple)]; resolved = [r[0] for r in answered if r[1] == 0 and r[2]]
+    rcode = next((r[1] for r in answered if r[1] != 0), 0) if answered else None
+    return (sum(resolved) / len(resolved) if resolved else None, len(answered) - len(resolved),
+            DNS_RCODES.get(rcode, str(rcode)) if rcode is not None else None, sum(r[2] for r in answered))
+
+def build_dns_query(qid, name, qtype=1):
+    qname = b''.join(bytes([len(label)]) + label for label in (part.encode('idna') for part in name.rstrip('.').split('.'))) + b'\0'
+    return struct.pack('>HHHHHH', qid, 0x0100, 1, 0, 0, 0) + qname + struct.pack('>HH', qtype, 1)
+
+def parse_dns_response(data):
+    # Returns (qid, rcode, answer_count), or None for anything that is not a DNS response header.
+    if len(data) < 12: return None
+    qid, flags, _, ancount, _, _ = struct.unpack_from('>HHHHHH', data)
+    if not flags & 0x8000: return None
+    return qid, flags & 0x000F, ancount
+
+class _DNSDatagramProtocol:
+    # Implements asyncio's datagram protocol interface without subclassing asyncio.DatagramProtocol, so defining it
+    # does not import asyncio.
+    def __init__(self): self.transport = None; self.pending = {}
+    def connection_made(self, transport): self.transport = transport
+    def connection_lost(self, exc): pass
+    def pause_writing(self): pass
+    def resume_writing(self): pass
+    def error_received(self, exc): pass
+    def datagram_received(self, data, addr):
+        if len(data) < 2: return
+        waiter = self.pending.pop((addr[0], int.from_bytes(data[:2], 'big')), None)
+        if waiter is not None and not waiter.done(): waiter.set_result((time.perf_counter(), data))
+
+class DNSProber:
+    # Sends real DNS queries from one event loop. All UDP queries of one address family share a single socket and
+    # replies are matched back by (resolver, query id), so thousands of resolvers can be in flight at once.
+    def __init__(self, names=DNS_PROBE_NAMES, timeout=2.0, port=53, use_tcp=False, qtype=1):
+        self.names = tuple(names); self.timeout = timeout; self.port = port; self.use_tcp = use_tcp; self.qtype = qtype
+        self._endpoints = {}
+
+    async def _protocol(self, family):
+        if family not in self._endpoints:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            # A large receive buffer keeps bursts of replies from thousands of resolvers from being dropped by the kernel.
+            try: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            except OSError: pass
+            try: sock.bind(('::', 0) if family == socket.AF_INET6 else ('0.0.0.0', 0)); sock.setblocking(False)
+            except OSError: sock.close(); raise
+            self._endpoints[family] = asyncio.ensure_future(asyncio.get_running_loop().create_datagram_endpoint(_DNSDatagramProtocol, sock=sock))
+        _, protocol = await self._endpoints[family]
+        return protocol
+
+    async def query_udp(self, ip, name):
+        # A socket that cannot be opened (e.g. no IPv6 on this host) is reported like a timeout, no route to the
+        # resolver as UNREACHABLE.
+        protocol = qid = None
+        try:
+            protocol = await self._protocol(socket.AF_INET6 if ':' in ip else socket.AF_INET)
+            qid = random.getrandbits(16)
+            while (ip, qid) in protocol.pending: qid = random.getrandbits(16)
+            waiter = asyncio.get_running_loop().create_future(); protocol.pending[(ip, qid)] = waiter
+            started = time.perf_counter()
+            protocol.transport.sendto(build_dns_query(qid, name, self.qtype), (ip, self.port))
+            finished, data = await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError: return None
+        except OSError as e: return UNREACHABLE if protocol is not None and definite_failure(e) else None
+        finally:
+            if protocol is not None: protocol.pending.pop((ip, qid), None)
+        parsed = parse_dns_response(data)
+        return ((finished - started) * 1000, parsed[1], parsed[2]) if parsed else None
+
+    async def query_tcp(self, ip, name):
+        writer = None; started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, self.port), self.timeout)
+            message = build_dns_query(random.getrandbits(16), name, self.qtype)
+            writer.write(struct.pack('>H', len(message)) + message)
+            async def read_reply():
+                length = struct.unpack('>H', await reader.readexactly(2))[0]
+                return await reader.readexactly(length)
+            data = await asyncio.wait_for(read_reply(), max(self.timeout - (time.perf_counter() - started), 0.001))
+            finished = time.perf_counter()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError): return None
+        except OSError as e: return UNREACHABLE if definite_failure(e) else None
+        finally:
+            if writer is not None: writer.close()
+        parsed = parse_dns_response(data)
+        return ((finished - started) * 1000, parsed[1], parsed[2]) if parsed else None
+
+    async def probe(self, dns_ip, short_circuit=False):
+        try: ip = ipaddress.ip_address(dns_ip).compressed
+        except ValueError: return DNSProbeResult(dns_ip, None, 0, 0, 0, None, 0)
+        query = self.query_tcp if self.use_tcp else self.query_udp
+        replies = []; names = self.names
+        if short_circuit:
+            # A resolver that refuses the first query (or cannot be reached at all) is not asked the rest.
+            first = await query(ip, names[0]); replies.append(first); names = names[1:]
+            if first is UNREACHABLE or (first is not None and first[1] in DNS_REFUSING_RCODES): names = ()
+        replies += await asyncio.gather(*(query(ip, name) for name in names))
+        latency, errors, rcode, answers = summarize_replies(replies)
+        return DNSProbeResult(dns_ip, latency, len(replies), sum(1 for r in replies if not isinstance(r, tuple)), errors, rcode, answers)
+
+    def close(self):
+        for endpoint in self._endpoints.values():
+            if endpoint.done() and not endpoint.exception(): endpoint.result()[0].close()
+        self._endpoints.clear()
+
+# ==============================================================================
+#  Encrypted DNS Prober (DoT / DoH)
+# ==============================================================================
+ENCRYPTED_PROBE_MODES = ('dot', 'doh')
+ENCRYPTED_DEFAULT_PORTS = {'dot': 853, 'doh': 443}
+
+class TLSTiming(collections.namedtuple('TLSTiming', 'connect_ms handshake_ms first_ms query_ms resumed')):
+    # connect/handshake/first are None when the whole probe ran on a connection kept from an earlier probe.
+    __slots__ = ()
+
+class EncryptedProbeResult(collections.namedtuple('EncryptedProbeResult', 'dns_ip latency queries timeouts errors rcode answers timing')):
+    # Same loss, rcode and answer accounting as DNSProbeResult.
+    __slots__ = ()
+    @property
+    def loss(self): return round((self.timeouts + self.errors) * 100 / self.queries) if self.queries else 100
+
+class _TLSConnection:
+    # TLS driven through ssl.MemoryBIO over a plain asyncio TCP stream. Unlike asyncio's built-in TLS this lets a new
+    # connection resume a stored session (wrap_bio(session=...)), and it keeps TCP connect and handshake timed apart.
+    def __init__(self, reader, writer, sslobj, incoming, outgoing):
+        self.reader = reader; self.writer = writer; self.sslobj = sslobj; self.incoming = incoming; self.outgoing = outgoing
+        self.buffer = b''; self.reusable = True
+
+    @classmethod
+    async def open(cls, context, host, port, session, timeout):
+        # Returns (connection, connect_ms, handshake_ms).
+        started = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        connected = time.perf_counter()
+        incoming = ssl.MemoryBIO(); outgoing = ssl.MemoryBIO()
+        try:
+            connection = cls(reader, writer, context.wrap_bio(incoming, outgoing, server_hostname=host, session=session), incoming, outgoing)
+            await asyncio.wait_for(connection._handshake(), max(timeout - (connected - started), 0.001))
+        except BaseException: writer.close(); raise
+        return connection, (connected - started) * 1000, (time.perf_counter() - connected) * 1000
+
+    async def _flush(self):
+        data = self.outgoing.read()
+        if data: self.writer.write(data); await self.writer.drain()
+
+    async def _fill(self):
+        await self._flush()
+        data = await self.reader.read(65536)
+        if not data: raise ConnectionResetError("connection closed by the server")
+        self.incoming.write(data)
+
+    async def _handshake(self):
+        while True:
+            try: self.sslobj.do_handshake(); break
+            except ssl.SSLWantReadError: await self._fill()
+        await self._flush()
+
+    async def send(self, data): self.sslobj.write(data); await self._flush()
+
+    async def _recv(self):
+        while True:
+            try: data = self.sslobj.read(65536)
+            except ssl.SSLWantReadError: await self._fill(); continue
+            except ssl.SSLZeroReturnError: raise ConnectionResetError("TLS connection closed by the server")
+            # After a close_notify the SSL object returns b'' instead of raising; without this, the read loops spin forever.
+            if not data: raise ConnectionResetError("TLS connection closed by the server")
+            return data
+
+    async def readexactly(self, size):
+        while len(self.buffer) < size: self.buffer += await self._recv()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    async def readuntil(self, separator, limit=65536):
+        while separator not in self.buffer:
+            if len(self.buffer) > limit: raise ValueError("response header too long")
+            self.buffer += await self._recv()
+        data, self.buffer = self.buffer.split(separator, 1)
+        return data
+
+    @property
+    def closed(self): return self.writer.is_closing() or self.reader.at_eof()
+
+    def close(self): self.writer.close()
+
+class EncryptedDNSProber:
+    # Measures DNS over TLS (RFC 7858) or DNS over HTTPS (RFC 8484, HTTP/1.1 POST). A probe times TCP connect, TLS
+    # handshake, the first query on a new connection and the queries after it separately. Connections are kept idle
+    # per resolver and reused by the next probe, and TLS sessions are stored so a replaced connection resumes instead
+    # of doing a full handshake; repeated probes (e.g. `monitor`) therefore measure steady-state query latency.
+    def __init__(self, protocol='dot', names=DNS_PROBE_NAMES, timeout=2.0, port=None, path='/dns-query', ca_file=None, verify=True,
+                 max_idle=256, idle_timeout=30.0, max_sessions=4096, qtype=1):
+        self.protocol = protocol; self.names = tuple(names); self.timeout = timeout; self.port = port or ENCRYPTED_DEFAULT_PORTS[protocol]
+        self.path = path; self.qtype = qtype; self.max_idle = max_idle; self.idle_timeout = idle_timeout; self.max_sessions = max_sessions
+        self.context = ssl.create_default_context(cafile=ca_file)
+        if not verify: self.context.check_hostname = False; self.context.verify_mode = ssl.CERT_NONE
+        self.context.set_alpn_protocols(['dot'] if protocol == 'dot' else ['http/1.1'])
+        self._idle = collections.OrderedDict(); self._sessions = collections.OrderedDict()
+        METRICS.gauge('tls_idle_connections', lambda: len(self._idle))
+
+    def _take_idle(self, host):
+        entry = self._idle.pop(host, None)
+        if entry is None: return None
+        connection, since = entry
+        if connection.closed or time.monotonic() - since > self.idle_timeout: connection.close(); return None
+        return connection
+
+    def _keep(self, host, connection):
+        if connection.sslobj.session is not None:
+            self._sessions[host] = connection.sslobj.session; self._sessions.move_to_end(host)
+            while len(self._sessions) > self.max_sessions: self._sessions.popitem(last=False)
+        if not connection.reusable or connection.closed: connection.close(); return
+        old = self._idle.pop(host, None)
+        if old: old[0].close()
+        self._idle[host] = (connection, time.monotonic())
+        while len(self._idle) > self.max_idle: self._idle.popitem(last=False)[1][0].close()
+
+    async def _query_dot(self, connection, host, name):
+        qid = random.getrandbits(16); message = build_dns_query(qid, name, self.qtype)
+        await connection.send(struct.pack('>H', len(message)) + message)
+        while True:
+            data = await connection.readexactly(struct.unpack('>H', await connection.readexactly(2))[0])
+            parsed = parse_dns_response(data)
+            if parsed and parsed[0] == qid: return parsed
+
+    async def _query_doh(self, connection, host, name):
+        # ID 0, as RFC 8484 recommends, so responses stay cacheable.
+        message = build_dns_query(0, name, self.qtype); authority = f"[{host}]" if ':' in host else host
+        await connection.send((f"POST {self.path} HTTP/1.1\r\nHost: {authority}\r\nContent-Type: application/dns-message\r\n"
+                               f"Accept: application/dns-message\r\nContent-Length: {len(message)}\r\n\r\n").encode('ascii') + message)
+        status_line, *header_lines = (await connection.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+        headers = {key.strip().lower(): value.strip() for key, _, value in (line.partition(':') for line in header_lines)}
+        if headers.get('connection', '').lower() == 'close': connection.reusable = False
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await connection.readuntil(b"\r\n")).split(b';', 1)[0], 16); chunk = await connection.readexactly(size + 2)
+                if not size: break
+                body += chunk[:-2]
+        else: body = await connection.readexactly(int(headers.get('content-length', 0)))
+        if status_line.split(' ', 2)[1:2] != ['200']: raise ValueError(f"DoH server answered {status_line!r}")
+        parsed = parse_dns_response(body)
+        if parsed is None: raise ValueError("DoH response is not a DNS message")
+        return parsed
+
+    async def probe(self, dns_ip, short_circuit=False):
+        try: host = ipaddress.ip_address(dns_ip).compressed
+        except ValueError: host = dns_ip.rstrip('.')  # DoT/DoH resolvers are often listed by name (e.g. dns.google)
+        query = self._query_dot if self.protocol == 'dot' else self._query_doh
+        connection = self._take_idle(host); fresh = retried = False
+        connect_ms = handshake_ms = first_ms = resumed = None; latencies = []; replies = []; timeouts = skipped = 0; first_resolved = False
+        names = list(self.names); index = 0
+        while index < len(names):
+            if connection is None:
+                try: connection, connect_ms, handshake_ms = await _TLSConnection.open(self.context, host, self.port, self._sessions.get(host), self.timeout)
+                except (OSError, asyncio.TimeoutError, ssl.SSLError, ssl.CertificateError) as e:
+                    timeouts += 1; index += 1
+                    if isinstance(e, asyncio.TimeoutError): continue
+                    # A refused connection or a failed TLS handshake fails the same way on every attempt.
+                    METRICS.error('tls', f"TLS Error for {host}: {e}")
+                    if short_circuit: timeouts += len(names) - index; break
+                    continue
+                fresh = True; resumed = connection.sslobj.session_reused
+                METRICS.inc('tls_handshakes_total', resumed='yes' if resumed else 'no')
+            elif not fresh and index == 0: METRICS.inc('tls_connection_reuse_total')
+            started = time.perf_counter()
+            try: _, rcode, answers = await asyncio.wait_for(query(connection, host, names[index]), self.timeout)
+            except (OSError, asyncio.TimeoutError, ssl.SSLError, ValueError, IndexError) as e:
+                connection.close(); connection = None
+                # An idle connection the server has meanwhile closed is not a failure of the resolver; retry once.
+                if not fresh and not retried and not isinstance(e, asyncio.TimeoutError): retried = True; continue
+                if isinstance(e, ValueError): METRICS.error('tls', f"DoH Error for {host}: {e}")
+                timeouts += 1; index += 1
+                continue
+            # The first query on a new connection is timed either way; only resolved queries count towards latency.
+            latency = (time.perf_counter() - started) * 1000; resolved = rcode == 0 and answers > 0
+            replies.append((latency, rcode, answers))
+            if fresh and first_ms is None: first_ms = latency; first_resolved = resolved
+            elif resolved: latencies.append(latency)
+            index += 1
+            # A DoH server that answered `Connection: close` drops the connection; reconnect (and resume) for the next name.
+            if not connection.reusable: self._keep(host, connection); connection = None
+            if short_circuit and len(replies) == 1 and rcode in DNS_REFUSING_RCODES: skipped = len(names) - index; break
+        if connection is not None: self._keep(host, connection)
+        steady = latencies or ([first_ms] if first_resolved else [])
+        _, errors, rcode, answers = summarize_replies(replies)
+        return EncryptedProbeResult(dns_ip, sum(steady) / len(steady) if steady else None, len(names), timeouts, errors + skipped, rcode, answers,
+                                    TLSTiming(connect_ms, handshake_ms, first_ms, sum(latencies) / len(latencies) if latencies else None, resumed))
+
+    def close(self):
+        for connection, _ in self._idle.values(): connection.close()
+        self._idle.clear()
+
+# ==============================================================================
+#  ICMP Echo Engine
+# ==============================================================================
+def _icmp_checksum(data):
+    if len(data) % 2: data += b'\0'
+    total = sum(struct.unpack(f'>{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF); total += total >> 16
+    return ~total & 0xFFFF
+
+class _TimerWheel:
+    # Hashed timer wheel: O(1) insert, and each tick only inspects one slot instead of every outstanding echo.
+    def __init__(self, tick=0.01, size=512):
+        self.tick = tick; self.slots = [[] for _ in range(size)]; self.origin = time.perf_counter(); self.cursor = 0
+
+    def add(self, deadline, entry):
+        due = max(int((deadline - self.origin) / self.tick) + 1, self.cursor)
+        self.slots[due % len(self.slots)].append((due, entry))
+
+    def expire(self, now):
+        now_tick = int((now - self.origin) / self.tick); expired = []
+        while self.cursor <= now_tick:
+            slot = self.slots[self.cursor % len(self.slots)]
+            if slot:
+                expired.extend(entry for due, entry in slot if due <= self.cursor)
+                slot[:] = [(due, entry) for due, entry in slot if due > self.cursor]
+            self.cursor += 1
+        return expired
+
+class ICMPEngine:
+    # Multiplexes echo requests to every target over one ICMP socket per address family. Unprivileged SOCK_DGRAM
+    # ICMP is tried first and raw sockets second; replies are matched by (address, sequence) on monotonic timestamps.
+    def __init__(self, loop, sockets, tick=0.01):
+        self.loop = loop; self.sockets = sockets; self.pending = {}; self.wheel = _TimerWheel(tick)
+        self.ident = random.getrandbits(16); self._seq = 0; self._ticking = False
+        for family, (sock, raw) in sockets.items(): loop.add_reader(sock.fileno(), self._on_readable, family)
+
+    @classmethod
+    async def open(cls):
+        # Returns None when no ICMP socket can be opened (or the loop cannot watch it) so callers keep using `ping`.
+        loop = asyncio.get_running_loop(); sockets = {}
+        for family, proto in ((socket.AF_INET, socket.IPPROTO_ICMP), (socket.AF_INET6, getattr(socket, 'IPPROTO_ICMPV6', 58))):
+            for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+                try: sock = socket.socket(family, kind, proto)
+                except (OSError, ValueError): continue
+                try: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+                except OSError: pass
+                sock.setblocking(False); sockets[family] = (sock, kind == socket.SOCK_RAW); break
+        if socket.AF_INET not in sockets:
+            for sock, _ in sockets.values(): sock.close()
+            return None
+        try: return cls(loop, sockets)
+        except NotImplementedError:
+            for sock, _ in sockets.values(): sock.close()
+            return None
+
+    def supports(self, ip):
+        try: return (socket.AF_INET6 if ipaddress.ip_address(ip).version == 6 else socket.AF_INET) in self.sockets
+        except ValueError: return False
+
+    def _next_seq(self, ip):
+        for _ in range(0x10000):
+            self._seq = (self._seq + 1) & 0xFFFF
+            if (ip, self._seq) not in self.pending: return self._seq
+        raise OSError("no free ICMP sequence numbers")
+
+    def _send(self, ip, family, timeout):
+        sock, raw = self.sockets[family]
+        seq = self._next_seq(ip); waiter = self.loop.create_future()
+        echo_type = 128 if family == socket.AF_INET6 else 8
+        payload = struct.pack('>d', time.perf_counter()) + b'IRNET-DNS-CHECKER'
+        header = struct.pack('>BBHHH', echo_type, 0, 0, self.ident, seq)
+        if family == socket.AF_INET: header = struct.pack('>BBHHH', echo_type, 0, _icmp_checksum(header + payload), self.ident, seq)
+        sent_at = time.perf_counter()
+        try: sock.sendto(header + payload, (ip, 0))
+        except OSError as e: waiter.set_result(UNREACHABLE if definite_failure(e) else None); return waiter
+        self.pending[(ip, seq)] = (waiter, sent_at)
+        self.wheel.add(sent_at + timeout, ((ip, seq), waiter))
+        if not self._ticking: self._ticking = True; self.loop.call_later(self.wheel.tick, self._on_tick)
+        return waiter
+
+    def _on_readable(self, family):
+        sock, raw = self.sockets[family]
+        while True:
+            try: data, addr = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError): return
+            except OSError: return
+            received_at = time.perf_counter()
+            # IPv4 raw sockets (and some DGRAM implementations) hand back the IP header as well.
+            if family == socket.AF_INET and data and data[0] >> 4 == 4: data = data[(data[0] & 0x0F) * 4:]
+            if raw and len(data) >= 8 and data[0] == (1 if family == socket.AF_INET6 else 3): self._on_unreachable(family, data); continue
+            if len(data) < 8 or data[0] != (129 if family == socket.AF_INET6 else 0): continue
+            ident, seq = struct.unpack_from('>HH', data, 4)
+            if raw and ident != self.ident: continue
+            entry = self.pending.pop((ipaddress.ip_address(addr[0]).compressed, seq), None)
+            if entry and not entry[0].done(): entry[0].set_result((received_at - entry[1]) * 1000)
+
+    def _on_unreachable(self, family, data):
+        # Raw sockets also receive "destination unreachable" for our own echoes, quoting the original IP header and
+        # echo header after the ICMP header. (Unprivileged DGRAM sockets only report these on the error queue.)
+        inner = data[8:]
+        if family == socket.AF_INET: header = (inner[0] & 0x0F) * 4 if inner else 0; address = inner[16:20]
+        else: header = 40; address = inner[24:40]
+        echo = inner[header:header + 8]
+        if header < 20 or len(address) != (16 if family == socket.AF_INET6 else 4) or len(echo) < 8: return
+        if echo[0] != (128 if family == socket.AF_INET6 else 8) or struct.unpack_from('>H', echo, 4)[0] != self.ident: return
+        entry = self.pending.pop((ipaddress.ip_address(address).compressed, struct.unpack_from('>H', echo, 6)[0]), None)
+        if entry and not entry[0].done(): entry[0].set_result(UNREACHABLE)
+
+    def _on_tick(self):
+        for key, waiter in self.wheel.expire(time.perf_counter()):
+            if self.pending.get(key, (None,))[0] is waiter: del self.pending[key]
+            if not waiter.done(): waiter.set_result(None)
+        if self.pending: self.loop.call_later(self.wheel.tick, self._on_tick)
+        else: self._ticking = False
+
+    async def ping(self, dns_ip, count=4, timeout=2.0, interval=0.2, short_circuit=False):
+        # Same (avg_ms, loss_percent) pair that the `ping` output parser produced.
+        ip = ipaddress.ip_address(dns_ip)
+        family = socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+        waiters = [self._send(ip.compressed, family, timeout)]
+        for _ in range(count - 1):
+            await asyncio.sleep(interval)
+            # A lost first echo may just be loss; only an unreachable reply ends the probe early.
+            if short_circuit and waiters[0].done() and waiters[0].result() is UNREACHABLE: return None, 100
+            waiters.append(self._send(ip.compressed, family, timeout))
+        rtts = [rtt for rtt in await asyncio.gather(*waiters) if isinstance(rtt, float)]
+        return (sum(rtts) / len(rtts) if rtts else None), round((count - len(rtts)) * 100 / count)
+
+    def close(self):
+        for sock, _ in self.sockets.values():
+            self.loop.remove_reader(sock.fileno()); sock.close()
+        self.sockets = {}
+
+# ==============================================================================
+#  Adaptive Scan Scheduler
+# ==============================================================================
+class ScanScheduler:
+    # Pulls targets lazily into a bounded in-flight window on the event loop. The window grows while probes come back
+    # clean and is halved (AIMD) when the short-term timeout/loss rate jumps above its long-term level, which is how
+    # local congestion shows up; a steady share of dead hosts in a sweep does not shrink it. Optional per-key caps
+    # (e.g. per ASN or per /24) limit how many probes hit one network at once. Targets that would exceed a cap are
+    # parked (up to `max_deferred`) and launched when a probe for that key finishes. A target iterator that yields
+    # IDLE has nothing to hand out yet but is not exhausted; call wake() once it has more.
+    IDLE = object()
+
+    def __init__(self, probe, window=64, min_window=4, max_window=1024, limits=None, limit_keys=None, max_deferred=4096):
+        self.probe = probe; self.window = float(min(window, max_window)); self.min_window = min_window; self.max_window = max_window
+        self.limits = limits or {}; self.limit_keys = limit_keys; self.max_deferred = max_deferred
+        self.paused = False; self.cancelled = False
+        self.completed = 0; self.fast_rate = self.slow_rate = 0.0; self.slow_start = True; self.congested = False; self._next_decrease = 0
+        self._launched = self._observed = 0; self._outcomes = {}
+        self._in_flight = set(); self._active = collections.Counter(); self._deferred = collections.defaultdict(collections.deque)
+        self._deferred_count = 0; self._retry = collections.deque(); self._done = collections.deque()
+        self._exhausted = False; self._wake = None
+
+    # pause/resume/cancel must run on the scheduler's loop; use loop.call_soon_threadsafe from other threads.
+    def pause(self): self.paused = True
+
+    def resume(self):
+        self.paused = False
+        if self._wake: self._wake.set()
+
+    def wake(self):
+        if self._wake: self._wake.set()
+
+    def cancel(self):
+        self.cancelled = True
+        for task in list(self._in_flight): task.cancel()
+        if self._wake: self._wake.set()
+
+    @property
+    def in_flight(self): return len(self._in_flight)
+
+    @property
+    def ready(self): return len(self._done)
+
+    async def run(self, targets):
+        targets = iter(targets); self._wake = asyncio.Event()
+        try:
+            while not self.cancelled:
+                self._fill(targets)
+                if self._done:
+                    yield self._done.popleft(); continue
+                if not self._in_flight and not self._retry and self._exhausted: return
+                self._wake.clear(); await self._wake.wait()
+        finally: self.cancel()
+
+    def _fill(self, targets):
+        while not self.cancelled and not self.paused and len(self._in_flight) < int(self.window):
+            if self._retry: target, keys = self._retry.popleft(); self._deferred_count -= 1
+            elif self._exhausted or self._deferred_count >= self.max_deferred: return
+            else:
+                target = next(targets, None)
+                if target is None: self._exhausted = True; return
+                if target is self.IDLE: return
+                keys = self.limit_keys(target) if self.limit_keys else ()
+            blocked = next((key for key in keys if self._active[key] >= self.limits[key[0]]), None)
+            if blocked is not None: self._deferred[blocked].append((target, keys)); self._deferred_count += 1; continue
+            for key in keys: self._active[key] += 1
+            task = asyncio.ensure_future(self.probe(target)); self._in_flight.add(task); self._launched += 1
+            task.add_done_callback(lambda task, keys=keys, seq=self._launched - 1: self._finished(task, keys, seq))
+
+    def _finished(self, task, keys, seq):
+        self._in_flight.discard(task)
+        for key in keys:
+            self._active[key] -= 1
+            if not self._active[key]: del self._active[key]
+            waiting = self._deferred.get(key)
+            if waiting:
+                self._retry.append(waiting.popleft())
+                if not waiting: del self._deferred[key]
+        signal = None
+        if task.cancelled(): METRICS.inc('probes_cancelled_total')
+        else:
+            if task.exception() is not None: METRICS.error('probe', f"Probe Error: {task.exception()}")
+            elif task.result() is not None:
+                result = task.result(); signal = 1.0 if result[1] is None else result[2] / 100
+                if signal == 0 and not self.congested:
+                    self.window = min(self.max_window, self.window + (1 if self.slow_start else 1 / self.window))
+                self._done.append(result)
+        # Loss is judged in launch order: dead hosts only report after the full timeout, so in completion order a
+        # steady share of them arrives in bursts that would look like congestion.
+        self._outcomes[seq] = signal
+        while self._observed in self._outcomes:
+            signal = self._outcomes.pop(self._observed); self._observed += 1
+            if signal is not None: self._adapt(signal)
+        self._wake.set()
+
+    def _adapt(self, signal):
+        self.completed += 1
+        # The long-term rate is a plain average over the first 200 results, so it is not stuck near 0 while warming up.
+        self.fast_rate += (signal - self.fast_rate) * 0.1; self.slow_rate += (signal - self.slow_rate) * max(0.005, 1 / self.completed)
+        # Only a jump beyond the short-term average's own random spread (two standard deviations) counts as congestion.
+        spread = 2 * math.sqrt(self.slow_rate * (1 - self.slow_rate) * 0.1 / 1.9)
+        self.congested = self.completed > 32 and self.fast_rate > self.slow_rate + 0.2 + spread
+        if self.congested and self.completed >= self._next_decrease:
+            self.window = max(self.min_window, self.window / 2); self.slow_start = False
+            self._next_decrease = self.completed + int(self.window)
+
+class TargetFeeder:
+    # Reads a target iterator that may block (stdin, a large file, a network range being expanded) on its own thread
+    # into a bounded buffer, so the scheduler's loop never waits on it. Iterating the feeder yields ScanScheduler.IDLE
+    # while the buffer is empty, and the thread calls the scheduler's wake() once it has more.
+    def __init__(self, targets, loop, size=4096):
+        self.targets = targets; self.loop = loop; self.size = size; self.scheduler = None
+        self.buffer = collections.deque(); self.done = self.stopped = self.waiting = False; self.error = None
+        self._lock = threading.Condition(); self._thread = threading.Thread(target=self._run, name="target-feeder", daemon=True)
+
+    def start(self, scheduler): self.scheduler = scheduler; self._thread.start(); return self
+
+    def _put(self, target=None, done=False):
+        with self._lock:
+            while not done and len(self.buffer) >= self.size and not self.stopped: self._lock.wait()
+            if self.stopped: return False
+            if done: self.done = True
+            else: self.buffer.append(target)
+            if self.waiting: self.waiting = False; self.loop.call_soon_threadsafe(self.scheduler.wake)
+            return True
+
+    def _run(self):
+        try:
+            for target in self.targets:
+                if not self._put(target): return
+        except Exception as e: self.error = e
+        self._put(done=True)
+
+    def __iter__(self):
+        while True:
+            with self._lock:
+                if self.buffer: target = self.buffer.popleft(); self._lock.notify()
+                elif self.done:
+                    if self.error: raise self.error
+                    return
+                else: self.waiting = True; target = ScanScheduler.IDLE
+            yield target
+
+    def stop(self):
+        with self._lock: self.stopped = True; self._lock.notify()
+
+# ==============================================================================
+#  GeoIP Enrichment Cache
+# ==============================================================================
+GEOIP_DIR = os.path.dirname(os.path.abspath(__file__))
+GEOIP_DATABASES = ('GeoLite2-City.mmdb', 'GeoLite2-ASN.mmdb')
+_geoip_readers = {}
+_geoip_readers_lock = threading.Lock()
+
+def geoip_reader(path):
+    # One reader per file for the whole process, opened on first use. The memory-mapped modes let the OS page the
+    # database in on demand, and those pages are shared with every other process mapping the same file (e.g. shard
+    # workers), instead of each process reading tens of MB into its own heap.
+    with _geoip_readers_lock:
+        if path not in _geoip_readers:
+            try: _geoip_readers[path] = maxminddb.open_database(path, maxminddb.MODE_MMAP_EXT)
+            except ValueError: _geoip_readers[path] = maxminddb.open_database(path, maxminddb.MODE_MMAP)  # no C extension
+        return _geoip_readers[path]
+
+class GeoIPCache:
+    # Caches (country, isp, asn) per network prefix reported by the mmdb files, so one lookup answers every later IP
+    # in the same network. Entries are the intersection of the City and ASN networks, which keeps them disjoint.
+    # The databases (and the persistent cache, which is keyed to their build) are only opened by the first lookup.
+    FILE_VERSION = 1
+
+    def __init__(self, city_path, asn_path, max_entries=65536, path=None):
+        self.city_path = city_path; self.asn_path = asn_path; self.max_entries = max_entries; self.path = path
+        self.city_reader = self.asn_reader = self.epoch = None
+        self.entries = collections.OrderedDict(); self.prefix_lengths = {4: collections.Counter(), 6: collections.Counter()}
+        self.hits = self.misses = 0
+        self._lock = threading.Lock(); self._open_lock = threading.Lock(); self._opened = False
+
+    def _open(self):
+        with self._open_lock:
+            if self._opened: return
+            self.city_reader = geoip_reader(self.city_path) if self.city_path else None
+            self.asn_reader = geoip_reader(self.asn_path) if self.asn_path else None
+            self.epoch = [reader.metadata().build_epoch if reader else None for reader in (self.city_reader, self.asn_reader)]
+            if self.path: self.load()
+            self._opened = True
+
+    def _find(self, version, value):
+        bits = 32 if version == 4 else 128
+        for prefix_len in self.prefix_lengths[version]:
+            key = (version, prefix_len, value >> (bits - prefix_len))
+            if key in self.entries: self.entries.move_to_end(key); return self.entries[key]
+        return None
+
+    def _store(self, key, entry):
+        if key in self.entries: return
+        self.entries[key] = entry; self.prefix_lengths[key[0]][key[1]] += 1
+        while len(self.entries) > self.max_entries:
+            (version, prefix_len, _), _ = self.entries.popitem(last=False)
+            counter = self.prefix_lengths[version]; counter[prefix_len] -= 1
+            if not counter[prefix_len]: del counter[prefix_len]
+
+    def lookup(self, ip):
+        address = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(ip)
+        value = int(address)
+        if not self._opened: self._open()
+        with self._lock:
+            entry = self._find(address.version, value)
+            if entry is not None: self.hits += 1; return entry
+            self.misses += 1
+        city, city_prefix = self.city_reader.get_with_prefix_len(address) if self.city_reader else (None, 0)
+        asn, asn_prefix = self.asn_reader.get_with_prefix_len(address) if self.asn_reader else (None, 0)
+        country = ((city or {}).get('country') or {}).get('names', {}).get('en') or "N/A"
+        isp = (asn or {}).get('autonomous_system_organization') or "N/A"
+        entry = (country, isp, (asn or {}).get('autonomous_system_number'))
+        prefix_len = max(city_prefix, asn_prefix)
+        with self._lock: self._store((address.version, prefix_len, value >> ((32 if address.version == 4 else 128) - prefix_len)), entry)
+        return entry
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+        except (OSError, ValueError): return
+        # A new .mmdb build invalidates every cached network.
+        if data.get('version') != self.FILE_VERSION or data.get('epoch') != self.epoch: return
+        with self._lock:
+            for version, prefix_len, network, country, isp, asn in data.get('entries', [])[-self.max_entries:]:
+                self._store((version, prefix_len, network), (country, isp, asn))
+
+    def save(self):
+        if not self.path or not self._opened: return
+        with self._lock: entries = [[*key, *entry] for key, entry in self.entries.items()]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.FILE_VERSION, 'epoch': self.epoch, 'entries': entries}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+# ==============================================================================
+#  Target Loader
+# ==============================================================================
+MAX_TARGET_EXPANSION = 1 << 24  # a single network or range may expand to at most a /8 worth of addresses
+_HOSTNAME_RE = re.compile(r'(?=.*[A-Za-z])[A-Za-z0-9_-]{1,63}(\.[A-Za-z0-9_-]{1,63})*\.?')
+
+class TargetSet:
+    # Compact de-duplication set. IPv4 is bucketed per /16: sparse buckets are small int sets and dense ones switch to
+    # an 8 KiB bitmap, so sweeping whole /16s costs a few KiB each. IPv6 addresses and host names use plain sets.
+    DENSE_THRESHOLD = 256
+
+    def __init__(self): self.ipv4 = {}; self.ipv6 = set(); self.names = set()
+
+    def add(self, version, value):
+        if version == 6:
+            if value in self.ipv6: return False
+            self.ipv6.add(value); return True
+        bucket = self.ipv4.get(value >> 16); low = value & 0xFFFF
+        if bucket is None: self.ipv4[value >> 16] = {low}; return True
+        if isinstance(bucket, set):
+            if low in bucket: return False
+            bucket.add(low)
+            if len(bucket) > self.DENSE_THRESHOLD:
+                bitmap = bytearray(8192)
+                for item in bucket: bitmap[item >> 3] |= 1 << (item & 7)
+                self.ipv4[value >> 16] = bitmap
+            return True
+        if bucket[low >> 3] & (1 << (low & 7)): return False
+        bucket[low >> 3] |= 1 << (low & 7); return True
+
+    def add_name(self, name):
+        if name in self.names: return False
+        self.names.add(name); return True
+
+def _target_range(token):
+    # (version, first, last) as an inclusive integer range for an address, a CIDR block or an `a-b` range.
+    if '/' in token:
+        network = ipaddress.ip_network(token, strict=False)
+        first, last = int(network.network_address), int(network.broadcast_address)
+        if network.version == 4 and network.prefixlen < 31: first += 1; last -= 1  # network and broadcast addresses
+        return network.version, first, last
+    if '-' in token:
+        start, end = (part.strip() for part in token.split('-', 1)); start = ipaddress.ip_address(start)
+        if start.version == 4 and end.isdigit() and int(end) <= 255: end = ipaddress.ip_address(int(start) & ~0xFF | int(end))  # 10.0.0.5-20
+        else: end = ipaddress.ip_address(end)
+        if end.version != start.version or int(end) < int(start): raise ValueError(f"invalid range {token}")
+        return start.version, int(start), int(end)
+    address = ipaddress.ip_address(token)
+    return address.version, int(address), int(address)
+
+def _report_bad_target(line_no, token, reason): METRICS.error('input', f"Input Error (line {line_no}): {token!r} {reason}", always_print=True)
+
+def _parse_targets(lines, max_expansion, on_error):
+    # (version, first, last) for every address, network or range token of 'DNS LIST.txt'-style lines, and
+    # (None, name, name) for a host name. Bad tokens and oversized networks go to on_error and are skipped.
+    for line_no, line in enumerate(lines, 1):
+        for token in re.split(r'[\s,;]+', line.split('#', 1)[0].strip()):
+            if not token: continue
+            try: version, first, last = _target_range(token)
+            except ValueError:
+                if '/' not in token and '-' not in token[:1] and _HOSTNAME_RE.fullmatch(token):
+                    name = token.lower().rstrip('.'); yield None, name, name
+                else: on_error(line_no, token, "is not an IP address, network, range or host name")
+                continue
+            if last - first + 1 > max_expansion:
+                on_error(line_no, token, f"expands to more than {max_expansion} addresses"); continue
+            yield version, first, last
+
+def iter_targets(lines, dedupe=True, max_expansion=MAX_TARGET_EXPANSION, on_error=_report_bad_target):
+    # Streams targets from 'DNS LIST.txt'-style lines: '#' comments, then IPs, IPv6, CIDR blocks, `a-b` ranges or host
+    # names separated by whitespace or commas. Networks are expanded lazily, so memory stays flat for large sweeps.
+    seen = TargetSet() if dedupe else None
+    for version, first, last in _parse_targets(lines, max_expansion, on_error):
+        if version is None:
+            if seen is None or seen.add_name(first): yield first
+        elif version == 4:
+            for value in range(first, last + 1):
+                if seen is None or seen.add(4, value): yield socket.inet_ntoa(value.to_bytes(4, 'big'))
+        else:
+            for value in range(first, last + 1):
+                if seen is None or seen.add(6, value): yield ipaddress.IPv6Address(value).compressed
+
+def count_targets(lines, dedupe=True, max_expansion=MAX_TARGET_EXPANSION):
+    # How many targets iter_targets() yields for the same lines, worked out from the parsed ranges without expanding
+    # them (overlaps are merged), so a /8 counts as fast as one address. Bad tokens are left for the scan to report.
+    count = 0; names = set(); ranges = []
+    for version, first, last in _parse_targets(lines, max_expansion, lambda line_no, token, reason: None):
+        if not dedupe: count += 1 if version is None else last - first + 1
+        elif version is None: names.add(first)
+        else: ranges.append((version, first, last))
+    current = None; end = 0
+    for version, first, last in sorted(ranges):
+        if version == current and first <= end:
+            if last > end: count += last - end; end = last
+        else: count += last - first + 1; current = version; end = last
+    return count + len(names)
+
+def iter_target_file(path, **kwargs):
+    with open(path, 'r', encoding='utf-8') as f: yield from iter_targets(f, **kwargs)
+
+# ==============================================================================
+#  Result History Store
+# ==============================================================================
+DEFAULT_HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dns-history.sqlite3')
+
+class CachedResult(tuple):
+    # A result row served from the history store instead of a fresh probe.
+    __slots__ = ()
+
+class ResultStore:
+    # SQLite (WAL mode) history of every probe result, plus the latest result per resolver and probe mode for instant
+    # startup and incremental re-scans. Results of different probe modes (an ICMP ping and a DoT query) measure
+    # different things, so every read is per mode. Writes are batched into one transaction per `commit_every` rows or
+    # `commit_interval` s.
+    COLUMNS = "dns TEXT NOT NULL, ts REAL NOT NULL, ping REAL, loss INTEGER, location TEXT, isp TEXT, mode TEXT NOT NULL DEFAULT 'icmp'"
+
+    def __init__(self, path=DEFAULT_HISTORY_DB, commit_every=500, commit_interval=1.0):
+        self.path = path; self.commit_every = commit_every; self.commit_interval = commit_interval
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock(); self._uncommitted = 0; self._last_commit = time.monotonic()
+        try:
+            with self._lock: self._setup()
+        except sqlite3.Error: self.db.close(); raise
+
+    def _setup(self):
+        self.db.execute("PRAGMA journal_mode=WAL"); self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS probes ({self.COLUMNS})")
+        self.db.execute("CREATE INDEX IF NOT EXISTS probes_dns_ts ON probes (dns, ts)")
+        # Databases from before the mode was recorded only hold ICMP results, the only mode there was. SQLite cannot
+        # change a primary key in place, so their `latest` table is rebuilt keyed by (dns, mode).
+        columns = lambda table: [row[1] for row in self.db.execute(f"PRAGMA table_info({table})")]
+        if 'mode' not in columns('probes'): self.db.execute("ALTER TABLE probes ADD COLUMN mode TEXT NOT NULL DEFAULT 'icmp'")
+        old_latest = 'dns' in columns('latest') and 'mode' not in columns('latest')
+        if old_latest: self.db.execute("ALTER TABLE latest RENAME TO latest_old")
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS latest ({self.COLUMNS}, PRIMARY KEY (dns, mode))")
+        if old_latest:
+            self.db.execute("INSERT INTO latest SELECT dns, ts, ping, loss, location, isp, 'icmp' FROM latest_old"); self.db.execute("DROP TABLE latest_old")
+        self.db.commit()
+
+    def record(self, result, mode='icmp', ts=None):
+        row = (result[0], time.time() if ts is None else ts, *result[1:5], mode)
+        with self._lock:
+            self.db.execute("INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self.db.execute("INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval: self._commit()
+
+    def _commit(self):
+        self.db.commit(); self._uncommitted = 0; self._last_commit = time.monotonic()
+
+    def flush(self):
+        with self._lock: self._commit()
+
+    def fresh_result(self, dns_ip, ttl, mode='icmp'):
+        # The last result of this probe mode if it is newer than `ttl` seconds and was not a failure; otherwise None
+        # (needs a probe).
+        with self._lock:
+            row = self.db.execute("SELECT dns, ping, loss, location, isp FROM latest WHERE dns = ? AND mode = ? AND ts >= ? AND ping IS NOT NULL AND loss < 100",
+                                  (dns_ip, mode, time.time() - ttl)).fetchone()
+        return CachedResult(row) if row else None
+
+    # The readers below take mode=None for every mode; their rows end with the mode.
+    def latest(self, mode=None):
+        with self._lock:
+            return self.db.execute("SELECT dns, ping, loss, location, isp, ts, mode FROM latest WHERE ? IS NULL OR mode = ? ORDER BY ts", (mode, mode)).fetchall()
+
+    def history(self, dns_ip, since=None, mode=None):
+        with self._lock:
+            return self.db.execute("SELECT ts, ping, loss, mode FROM probes WHERE dns = ? AND ts >= ? AND (? IS NULL OR mode = ?) ORDER BY ts",
+                                   (dns_ip, since or 0, mode, mode)).fetchall()
+
+    def summary(self, since=None, mode=None):
+        # Per-resolver (and per-mode) trend figures straight from the history, without rescanning anything.
+        with self._lock:
+            return self.db.execute("SELECT dns, COUNT(*), AVG(ping), MIN(ping), MAX(ping), AVG(loss), MAX(ts), mode FROM probes "
+                                   "WHERE ts >= ? AND (? IS NULL OR mode = ?) GROUP BY dns, mode ORDER BY dns, mode", (since or 0, mode, mode)).fetchall()
+
+    def close(self):
+        with self._lock: self._commit(); self.db.close()
+
+# ==============================================================================
+#  Scan Pipeline (Headless)
+# ==============================================================================
+class DNSScanner:
+    # Everything needed to probe and enrich resolvers without Tk; the GUI and the CLI both drive this pipeline.
+    def __init__(self, lang_code='en', probe_mode='icmp', dns_prober=None, geoip_cache_path=None,
+                 max_in_flight=1024, per_asn_limit=None, per_prefix_limit=None, short_circuit=True, store=None, encrypted_prober=None):
+        self.lang = I18N[lang_code]
+        self.geoip_files = []
+        self.geoip_cache = None
+        self.setup_geoip(geoip_cache_path)
+
+        self.pause_event = threading.Event(); self.pause_event.set()
+        self.test_running = False
+        self.os_type = platform.system().lower()
+        self.probe_mode = probe_mode; self.dns_prober = dns_prober or DNSProber(); self.encrypted_prober = encrypted_prober
+        self.icmp_engine = None; self.ping_fallback = False; self._icmp_opening = None
+        self.max_in_flight = max_in_flight; self.per_asn_limit = per_asn_limit; self.per_prefix_limit = per_prefix_limit
+        self.short_circuit = short_circuit; self.scheduler = None
+        self.store = store; self.incremental_ttl = None
+        METRICS.gauge('in_flight', lambda: self.scheduler.in_flight if self.scheduler else 0)
+        METRICS.gauge('window', lambda: round(self.scheduler.window, 1) if self.scheduler else 0)
+        METRICS.gauge('results_ready', lambda: self.scheduler.ready if self.scheduler else 0)
+
+    def report_error(self, message): print(message, file=sys.stderr)
+
+    def setup_geoip(self, cache_path=None):
+        # Only checks that the databases exist; GeoIPCache opens them on the first lookup.
+        if not geoip_available():
+            self.report_error(self.lang["geoip_lib_error"])
+            return
+        for db_name in GEOIP_DATABASES:
+            db_file = os.path.join(GEOIP_DIR, db_name)
+            if os.path.isfile(db_file): self.geoip_files.append(db_file)
+            else: self.geoip_files.append(None); self.report_error(self.lang["geoip_db_error"].format(db_name=db_name))
+        if any(self.geoip_files): self.geoip_cache = GeoIPCache(*self.geoip_files, path=cache_path)
+
+    def close(self):
+        self.stop_scan()
+        if self.geoip_cache:
+            try: self.geoip_cache.save()
+            except OSError as e: METRICS.error('geoip_cache', f"GeoIP Cache Error: {e}")
+        if self.store: self.store.close(); self.store = None
+        if self.icmp_engine: background_loop().loop.call_soon_threadsafe(self.icmp_engine.close)
+        if self.encrypted_prober: background_loop().loop.call_soon_threadsafe(self.encrypted_prober.close)
+
+    def scan(self, dns_list):
+        # Runs the adaptive scheduler on the shared loop and yields results as they complete. Targets are read on a
+        # feeder thread, only its buffer and the scheduler's in-flight window are ever materialised, and pausing holds
+        # back new probes without blocking any thread. Nothing (asyncio, the loop, ICMP sockets) is started before the
+        # first target arrives, so an empty input exits at the cost of parsing the command line.
+        async def next_result(): return await results.__anext__()
+        targets = iter(dns_list); first = next(targets, None)
+        if first is None: return
+        dns_list = itertools.chain((first,), targets)
+        if self.probe_mode == 'icmp': background_loop().run(self.open_icmp_engine())
+        self.scheduler = self.new_scheduler()
+        if not self.pause_event.is_set(): self.scheduler.pause()
+        feeder = TargetFeeder(dns_list, background_loop().loop)
+        results = self.scheduler.run(feeder); feeder.start(self.scheduler)
+        try:
+            while self.test_running:
+                try: result = background_loop().run(next_result())
+                except StopAsyncIteration: return
+                if self.store and not isinstance(result, CachedResult): self.store.record(result, self.probe_mode)
+                yield result
+        finally:
+            feeder.stop(); background_loop().run(results.aclose())
+            if self.store: self.store.flush()
+
+    def new_scheduler(self):
+        window = self.max_in_flight
+        if self.probe_mode == 'icmp' and self.ping_fallback: window = min(window, 50)  # one `ping` process per probe
+        limits = {}
+        if self.per_asn_limit: limits['asn'] = self.per_asn_limit
+        if self.per_prefix_limit: limits['prefix'] = self.per_prefix_limit
+        return ScanScheduler(self.check_single_dns_async, window=min(64, window), max_window=window,
+                             limits=limits, limit_keys=self._limit_keys if limits else None)
+
+    async def open_icmp_engine(self):
+        # ICMP sockets are opened on first use and only in ICMP mode, so DNS/DoT/DoH scans, workers and monitors that
+        # never ping hold none. Without them every probe runs the `ping` command instead.
+        if self.probe_mode != 'icmp': return None
+        if self._icmp_opening is None: self._icmp_opening = asyncio.ensure_future(ICMPEngine.open())
+        self.icmp_engine = await asyncio.shield(self._icmp_opening); self.ping_fallback = self.icmp_engine is None
+        return self.icmp_engine
+
+    def _limit_keys(self, dns_ip):
+        try: address = ipaddress.ip_address(dns_ip)
+        except ValueError: return ()
+        keys = []
+        # /24 for IPv4; /48 is the comparable per-site allocation for IPv6.
+        if self.per_prefix_limit: keys.append(('prefix', address.version, int(address) >> (8 if address.version == 4 else 80)))
+        if self.per_asn_limit and self.geoip_cache:
+            asn = self.geoip_cache.lookup(address)[2]
+            if asn: keys.append(('asn', asn))
+        return keys
+
+    def set_paused(self, paused):
+        (self.pause_event.clear if paused else self.pause_event.set)()
+        if self.scheduler: background_loop().loop.call_soon_threadsafe(self.scheduler.pause if paused else self.scheduler.resume)
+
+    def stop_scan(self):
+        # Cancels every in-flight probe right away instead of letting queued work run to completion.
+        self.test_running = False; self.pause_event.set()
+        if self.scheduler: background_loop().loop.call_soon_threadsafe(self.scheduler.cancel)
+
+    def check_single_dns(self, dns_ip):
+        self.pause_event.wait()
+        if not self.test_running: return None
+        return background_loop().run(self.check_single_dns_async(dns_ip))
+
+    async def check_single_dns_async(self, dns_ip):
+        if not self.test_running: return None
+        if self.incremental_ttl and self.store:
+            # Incremental mode: only resolvers with no recent successful result are probed again.
+            cached = self.store.fresh_result(dns_ip, self.incremental_ttl, self.probe_mode)
+            if cached: METRICS.inc('cached_results_total'); return cached
+        started = time.perf_counter(); timing = rcode = None; answers = 0
+        if self.probe_mode in ENCRYPTED_PROBE_MODES:
+            result = await self.encrypted_prober.probe(dns_ip, short_circuit=self.short_circuit)
+            ping, loss, timing, rcode, answers = result.latency, result.loss, result.timing, result.rcode, result.answers
+        elif self.probe_mode == 'dns':
+            result = await self.dns_prober.probe(dns_ip, short_circuit=self.short_circuit)
+            ping, loss, rcode, answers = result.latency, result.loss, result.rcode, result.answers
+        else: ping, loss = await self._check_dns_quality(dns_ip)
+        enrich_started = time.perf_counter(); METRICS.observe('probe', enrich_started - started)
+        METRICS.inc('probes_total', result='timeout' if ping is None else 'partial' if loss else 'ok')
+        country, isp = self._get_ip_info_local(dns_ip)
+        METRICS.observe('enrich', time.perf_counter() - enrich_started)
+        # DNS/DoT/DoH results add (timing, rcode, answers); timing is a TLSTiming for DoT/DoH and None otherwise.
+        # ICMP results are the first five fields only, which is all that most consumers read.
+        if self.probe_mode == 'icmp': return (dns_ip, ping, loss, country, isp)
+        return (dns_ip, ping, loss, country, isp, timing, rcode, answers)
+
+    def _get_ip_info_local(self, ip):
+        if not self.geoip_cache: return "N/A", "N/A"
+        try:
+            country, isp, _ = self.geoip_cache.lookup(ip)
+            return country, isp
+        except Exception as e:
+            METRICS.error('enrich', f"GeoIP Error for {ip}: {e}")
+            return "Error", "Error"
+
+    async def _check_dns_quality(self, dns_ip):
+        icmp_engine = self.icmp_engine or await self.open_icmp_engine()
+        if icmp_engine and icmp_engine.supports(dns_ip):
+            return await icmp_engine.ping(dns_ip, short_circuit=self.short_circuit)
+        cmd = ["ping", "-n", "4", "-w", "2000", dns_ip] if self.os_type == "windows" else ["ping", "-c", "4", "-W", "2", dns_ip]
+        try:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            try: stdout, _ = await process.communicate()
+            except asyncio.CancelledError: process.kill(); raise
+            output = stdout.decode('utf-8', errors='ignore')
+            loss_match = re.search(r"\((\d+)% loss\)", output) or re.search(r"(\d+)%\s+packet loss", output)
+            ping_match = re.search(r"Average = (\d+)ms", output) or re.search(r"rtt min/avg/max/mdev = [\d.]+/([\d.]+)/", output)
+            loss = int(loss_match.group(1)) if loss_match else 100
+            ping = float(ping_match.group(1)) if ping_match else None
+            return ping, loss
+        except Exception: return None, 100
+
+# ==============================================================================
+#  Result Model
+# ==============================================================================
+class ResultModel:
+    # Typed result rows (numeric ping/loss) plus a maintained sort index. Views render from here and never hold data.
+    # Then the rcode and answer count of DNS/DoT/DoH probes, and last the DoT/DoH connection timings; columns a
+    # probe mode does not produce stay None.
+    COLUMNS = ('dns_server', 'avg_ping', 'packet_loss', 'location', 'isp', 'rcode', 'answers', 'tcp_connect', 'tls_handshake', 'first_query')
+    DNS_COLUMNS = COLUMNS[5:7]
+    TIMING_COLUMNS = COLUMNS[7:]
+
+    def __init__(self): self.clear()
+
+    def clear(self):
+        self.rows = []; self.sort_column = None; self.sort_reverse = False; self._keys = []; self._order = []
+
+    def __len__(self): return len(self.rows)
+
+    def _sort_key(self, row, index):
+        value = row[self.COLUMNS.index(self.sort_column)]
+        if self.sort_column == 'dns_server':
+            try: address = ipaddress.ip_address(value); value = (0, address.version, int(address), '')
+            except ValueError: value = (1, 0, 0, str(value))
+        elif self.sort_column == 'avg_ping' or self.sort_column in self.TIMING_COLUMNS: value = float('inf') if value is None else value
+        elif self.sort_column == 'answers': value = -1 if value is None else value
+        elif self.sort_column in ('location', 'isp', 'rcode'): value = str(value or '').casefold()
+        return value, index
+
+    def append(self, result):
+        timing = result[5] if len(result) > 5 and result[5] else (None,) * len(self.TIMING_COLUMNS)
+        dns_fields = tuple(result[6:8]) if len(result) > 7 else (None, None)
+        self.rows.append(tuple(result[:5]) + dns_fields + tuple(timing[:len(self.TIMING_COLUMNS)]))
+        if self.sort_column:
+            key = self._sort_key(self.rows[-1], len(self.rows) - 1); position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key); self._order.insert(position, len(self.rows) - 1)
+
+    def sort(self, column, reverse=False):
+        self.sort_column = column; self.sort_reverse = reverse
+        self._keys = sorted(self._sort_key(row, index) for index, row in enumerate(self.rows))
+        self._order = [key[1] for key in self._keys]
+
+    def row_index(self, position):
+        if not self.sort_column: return position
+        return self._order[len(self._order) - 1 - position if self.sort_reverse else position]
+
+    def row_at(self, position): return self.rows[self.row_index(position)]
+
+    def __iter__(self):
+        # Rows in display order.
+        for position in range(len(self.rows)): yield self.row_at(position)
+
+    def display_values(self, row, fail_text):
+        dns_ip, avg_ping, packet_loss, country, isp, rcode, answers = row[:7]
+        return (dns_ip, f"{avg_ping:.2f}" if avg_ping is not None else fail_text, f"{packet_loss}%", country, isp,
+                rcode or "-", "-" if answers is None else answers, *(f"{value:.2f}" if value is not None else "-" for value in row[7:]))
+
+INCREMENTAL_TTL = 3600  # seconds a successful result stays fresh for the GUI's incremental scan
+GUI_TICK_MS = 200  # how often the GUI drains the result queue
+
+def drain_results(results_queue, limit=10000):
+    # Takes what was queued since the last tick, capped so one tick never stalls the UI. Returns (results, done).
+    # Results are queued as (enqueued_at, result) so the time spent waiting for the tick is measured.
+    results = []; now = time.perf_counter()
+    try:
+        for _ in range(limit):
+            item = results_queue.get_nowait()
+            if item is None: continue
+            if item == "DONE": return results, True
+            METRICS.observe('queue_wait', now - item[0]); results.append(item[1])
+    except queue.Empty: pass
+    return results, False
+
+class DNSCheckerApp(DNSScanner):
+    column_to_lang_key = {'dns_server': 'col_dns', 'avg_ping': 'col_ping', 'packet_loss': 'col_loss', 'location': 'col_loc', 'isp': 'col_isp',
+                          'rcode': 'col_rcode', 'answers': 'col_answers', 'tcp_connect': 'col_connect', 'tls_handshake': 'col_tls', 'first_query': 'col_first_query'}
+    PROBE_MODES = ('icmp', 'dns') + ENCRYPTED_PROBE_MODES
+
+    def __init__(self, root, lang_code):
+        self.root = root
+        self.root.title(I18N[lang_code]["window_title"])
+        self.root.geometry("900x650")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        DNSScanner.__init__(self, lang_code, geoip_cache_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'GeoLite2-cache.json'))
+        try: self.store = ResultStore()
+        except sqlite3.Error as e: METRICS.error('history', f"History Error: {e}")
+
+        self.target_source = None; self.target_count = 0
+        self.gui_queue = queue.Queue()
+        self.model = ResultModel(); self.completed = 0; self.total_targets = 0
+        self.view_offset = 0; self.view_rows = 0; self.selected_row = None
+        self.sort_column = None; self.sort_reverse = False
+        self.stats_window = None
+        METRICS.gauge('queue_depth', self.gui_queue.qsize); METRICS.gauge('results_shown', lambda: len(self.model))
+        self.setup_widgets()
+        self.load_history()
+    
+    def report_error(self, message): messagebox.showerror(self.lang["err_title"], message)
+
+    def on_closing(self):
+        self.close()
+        self.root.destroy()
+
+    def setup_widgets(self):
+        main_frame = ttk.Frame(self.root, padding="10"); main_frame.pack(fill=tk.BOTH, expand=True)
+        input_frame = ttk.LabelFrame(main_frame, text=self.lang["input_frame"], padding="10"); input_frame.pack(fill=tk.X)
+        ttk.Label(input_frame, text=self.lang["single_dns_label"]).pack(side=tk.RIGHT, padx=(0, 5))
+        self.single_dns_entry = ttk.Entry(input_frame); self.single_dns_entry.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+        self.probe_mode_combo = ttk.Combobox(input_frame, state='readonly', width=16, values=[self.lang[f"probe_{mode}"] for mode in self.PROBE_MODES])
+        self.probe_mode_combo.current(0); self.probe_mode_combo.pack(side=tk.LEFT, padx=(0, 10))
+        self.probe_mode_combo.bind('<<ComboboxSelected>>', self.on_probe_mode_selected)
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.incremental_check = ttk.Checkbutton(input_frame, text=self.lang["incremental_check"], variable=self.incremental_var); self.incremental_check.pack(side=tk.LEFT, padx=(0, 10))
+        button_frame = ttk.Frame(main_frame, padding=(0, 10)); button_frame.pack(fill=tk.X)
+        self.single_test_button = ttk.Button(button_frame, text=self.lang["single_test_button"], command=self.start_single_test); self.single_test_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.file_test_button = ttk.Button(button_frame, text=self.lang["import_button"], command=self.load_file); self.file_test_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.start_button = ttk.Button(button_frame, text=self.lang["start_button"], command=self.start_scan, state=tk.DISABLED); self.start_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.pause_resume_button = ttk.Button(button_frame, text=self.lang["pause_button"], command=self.toggle_pause, state=tk.DISABLED); self.pause_resume_button.pack(side=tk.LEFT, padx=5)
+        self.export_csv_button = ttk.Button(button_frame, text=self.lang["export_csv_button"], command=lambda: self.export_results('csv'), state=tk.DISABLED); self.export_csv_button.pack(side=tk.LEFT, padx=5)
+        self.export_txt_button = ttk.Button(button_frame, text=self.lang["export_txt_button"], command=lambda: self.export_results('txt'), state=tk.DISABLED); self.export_txt_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text=self.lang["stats_button"], command=self.show_stats).pack(side=tk.LEFT, padx=5)
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100); self.progress_bar.pack(fill=tk.X, pady=5)
+        result_frame = ttk.LabelFrame(main_frame, text=self.lang["results_frame"], padding="10"); result_frame.pack(fill=tk.BOTH, expand=True, pady=(5,0))
+        columns = ResultModel.COLUMNS
+        self.tree = ttk.Treeview(result_frame, columns=columns, show='headings', selectmode='browse')
+        for col in columns: self.tree.heading(col, text=self.lang[self.column_to_lang_key[col]], command=lambda c=col: self.sort_by_column(c))
+        self.tree.column('dns_server', width=150, anchor=tk.W); self.tree.column('avg_ping', width=100, anchor=tk.CENTER)
+        self.tree.column('packet_loss', width=120, anchor=tk.CENTER); self.tree.column('location', width=120, anchor=tk.CENTER)
+        self.tree.column('isp', width=250, anchor=tk.W)
+        for col in ResultModel.DNS_COLUMNS: self.tree.column(col, width=90, anchor=tk.CENTER)
+        for col in ResultModel.TIMING_COLUMNS: self.tree.column(col, width=110, anchor=tk.CENTER)
+        self.tree.config(displaycolumns=columns[:5])
+        # The tree only ever holds the rows that fit on screen; the scrollbar drives an offset into self.model.
+        self.scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.on_scroll); self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind("<Configure>", self.on_tree_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.view_offset - (1 if e.delta > 0 else -1) * 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.view_offset - 3)); self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.view_offset + 3))
+        self.tree.bind("<Button-1>", self.select_row_at)
+        self.context_menu = tk.Menu(self.root, tearoff=0)
+        self.context_menu.add_command(label=self.lang["ctx_copy_dns"], command=self.copy_dns)
+        self.context_menu.add_command(label=self.lang["ctx_copy_ping"], command=self.copy_ping)
+        self.context_menu.add_separator(); self.context_menu.add_command(label=self.lang["ctx_copy_row"], command=self.copy_row)
+        self.tree.bind("<Button-3>", self.show_context_menu)
+        self.status_var = tk.StringVar(); self.status_var.set(self.lang["status_ready"])
+        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W, padding=5)
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
+    def load_file(self):
+        if self.test_running: return
+        filepath = filedialog.askopenfilename(title=self.lang["import_button"], filetypes=[(self.lang["file_dialog_txt"], "*.txt")])
+        if not filepath: return
+        try:
+            # Only counted here, from the parsed ranges; the scan streams the file again, so large sweeps are never
+            # expanded on the Tk thread or held in memory.
+            with open(filepath, 'r', encoding='utf-8') as f: count = count_targets(f)
+            if count:
+                self.target_source = lambda: iter_target_file(filepath); self.target_count = count
+                self.status_var.set(self.lang["status_loaded"].format(count=count))
+                self.start_button.config(state=tk.NORMAL)
+                self.clear_results()
+                self.toggle_ui_state(True) # Ensure buttons are in a clean state
+        except Exception as e: messagebox.showerror(self.lang["err_title"], self.lang["err_read_file"].format(e=e))
+
+    def start_scan(self):
+        if self.target_source: self.start_testing_thread(self.target_source(), self.target_count)
+
+    def start_single_test(self):
+        if self.test_running: return
+        text = self.single_dns_entry.get().strip()
+        # The single entry accepts anything a list line does, e.g. a CIDR block or a range.
+        count = count_targets([text])
+        if count: self.start_testing_thread(iter_targets([text]), count)
+
+    def start_testing_thread(self, dns_list, total):
+        if self.test_running: return
+        if maxminddb and not all(self.geoip_files):
+            messagebox.showerror(self.lang["err_title"], self.lang["geoip_db_error"].format(db_name="City/ASN"))
+            return
+        self.test_running = True; self.dns_to_test = dns_list; self.progress_var.set(0)
+        self.set_probe_mode(self.PROBE_MODES[self.probe_mode_combo.current()])
+        self.incremental_ttl = INCREMENTAL_TTL if self.incremental_var.get() else None
+        self.clear_results(); self.total_targets = total; METRICS.reset()
+        self.toggle_ui_state(False); self.pause_event.set()
+        threading.Thread(target=self.worker_function, daemon=True).start()
+        self.process_gui_queue()
+
+    def set_probe_mode(self, mode):
+        # The DoT/DoH prober outlives a single scan so re-tests reuse its pooled connections and TLS sessions.
+        if self.encrypted_prober and self.encrypted_prober.protocol != mode:
+            background_loop().loop.call_soon_threadsafe(self.encrypted_prober.close); self.encrypted_prober = None
+        if mode in ENCRYPTED_PROBE_MODES and not self.encrypted_prober:
+            self.encrypted_prober = EncryptedDNSProber(mode, names=self.dns_prober.names, timeout=self.dns_prober.timeout)
+        self.probe_mode = mode; self.tree.config(displaycolumns=self.shown_columns())
+
+    def shown_columns(self):
+        if self.probe_mode in ENCRYPTED_PROBE_MODES: return ResultModel.COLUMNS
+        return ResultModel.COLUMNS[:7] if self.probe_mode == 'dns' else ResultModel.COLUMNS[:5]
+
+    def worker_function(self):
+        for result in self.scan(self.dns_to_test):
+            if not self.test_running: break
+            self.gui_queue.put((time.perf_counter(), result))
+        self.gui_queue.put("DONE")
+
+    def process_gui_queue(self):
+        # Drains what was queued since the last tick, then redraws once.
+        results, done = drain_results(self.gui_queue)
+        if results:
+            started = time.perf_counter()
+            for result in results: self.model.append(result)
+            self.completed += len(results); self.render_view()
+            self.progress_var.set((self.completed / max(self.total_targets, 1)) * 100)
+            self.status_var.set(self.lang["status_testing"].format(current=self.completed, total=self.total_targets))
+            METRICS.observe('render', time.perf_counter() - started)
+        if done:
+            self.test_running = False; self.toggle_ui_state(True)
+            self.status_var.set(self.lang["status_done"]); self.progress_var.set(100)
+            messagebox.showinfo(self.lang["info_title"], self.lang["status_done"])
+            return
+        if self.test_running: self.root.after(GUI_TICK_MS, self.process_gui_queue)
+
+    def show_stats(self):
+        # A small live view of the metrics registry; refreshes itself once a second while open.
+        if self.stats_window and self.stats_window.winfo_exists(): self.stats_window.lift(); return
+        self.stats_window = tk.Toplevel(self.root); self.stats_window.title(self.lang["stats_title"])
+        label = ttk.Label(self.stats_window, font=('Courier', 10), justify=tk.LEFT, padding=10); label.pack(fill=tk.BOTH, expand=True)
+        def refresh():
+            if not self.stats_window.winfo_exists(): return
+            label.config(text=self.stats_text(METRICS.snapshot())); self.stats_window.after(1000, refresh)
+        refresh()
+
+    def stats_text(self, snapshot):
+        def seconds(value):
+            if value is None: return "-"
+            if value == float('inf'): return f">{Histogram.BOUNDS[-1]:g}s"
+            return f"<={value * 1000:g}ms" if value < 1 else f"<={value:g}s"
+        lines = [f"{'STAGE':<12}{'COUNT':>9}{'P50':>12}{'P95':>12}{'P99':>12}"]
+        for stage, stats in sorted(snapshot['stages'].items()):
+            lines.append(f"{stage:<12}{stats['count']:>9}{seconds(stats['p50_s']):>12}{seconds(stats['p95_s']):>12}{seconds(stats['p99_s']):>12}")
+        lines.append("")
+        lines += [f"{name:<40}{value:>12}" for name, value in snapshot['counters'].items()]
+        lines += [f"{name:<40}{value:>12}" for name, value in sorted(snapshot['gauges'].items())]
+        lines += [f"{stage}: {message}" for stage, message in snapshot['last_errors'].items()]
+        return "\n".join(lines)
+
+    def on_probe_mode_selected(self, event=None):
+        # Results of another probe type are not comparable, so the view switches to that type's last known results.
+        if self.test_running: return
+        self.set_probe_mode(self.PROBE_MODES[self.probe_mode_combo.current()]); self.clear_results(); self.load_history()
+
+    def load_history(self):
+        # Shows the last known result of every resolver for the selected probe type right away; a new scan replaces them.
+        if not self.store: return
+        for dns_ip, ping, loss, country, isp, ts, mode in self.store.latest(self.probe_mode): self.model.append((dns_ip, ping, loss, country, isp))
+        if len(self.model):
+            self.completed = len(self.model); self.render_view(); self.toggle_ui_state(True)
+            self.status_var.set(self.lang["status_history_loaded"].format(count=len(self.model)))
+
+    def clear_results(self):
+        self.model.clear(); self.completed = 0; self.view_offset = 0; self.selected_row = None
+        self.sort_reverse = False; self.reset_headings(); self.render_view()
+
+    def on_tree_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # The heading takes roughly one row of the widget's height.
+        self.view_rows = max(event.height // row_height - 1, 1); self.render_view()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto': self.scroll_to(int(float(amount) * len(self.model)))
+        elif action == 'scroll': self.scroll_to(self.view_offset + int(amount) * (self.view_rows if unit == 'pages' else 1))
+
+    def scroll_to(self, offset):
+        self.view_offset = max(0, min(offset, len(self.model) - self.view_rows)); self.render_view()
+
+    def render_view(self):
+        total = len(self.model); self.view_offset = max(0, min(self.view_offset, total - self.view_rows))
+        visible = min(self.view_rows, total - self.view_offset)
+        for slot in range(visible):
+            iid = f"row{slot}"; row_index = self.model.row_index(self.view_offset + slot)
+            values = self.model.display_values(self.model.rows[row_index], self.lang["ping_fail"])
+            if self.tree.exists(iid): self.tree.item(iid, values=values)
+            else: self.tree.insert('', tk.END, iid=iid, values=values)
+            if row_index == self.selected_row: self.tree.selection_set(iid)
+        stale = [iid for iid in self.tree.get_children() if int(iid[3:]) >= visible]
+        if stale: self.tree.delete(*stale)
+        if self.selected_row is None or not any(self.model.row_index(self.view_offset + slot) == self.selected_row for slot in range(visible)):
+            self.tree.selection_set(())
+        self.scrollbar.set(*((self.view_offset / total, (self.view_offset + visible) / total) if total else (0, 1)))
+
+    def select_row_at(self, event):
+        # Selection is tracked by model row, so it follows the data when the window scrolls or the sort changes.
+        iid = self.tree.identify_row(event.y)
+        if iid: self.selected_row = self.model.row_index(self.view_offset + int(iid[3:]))
+        return iid
+
+    def selected_result(self): return self.model.rows[self.selected_row]
+
+    def toggle_pause(self):
+        if self.pause_event.is_set():
+            self.set_paused(True); self.pause_resume_button.config(text=self.lang["resume_button"]); self.status_var.set(self.lang["status_paused"])
+        else:
+            self.set_paused(False); self.pause_resume_button.config(text=self.lang["pause_button"]); self.status_var.set(self.lang["status_testing"].format(current=self.completed, total=self.total_targets))
+
+    # --- FIX ---
+    # Corrected logic for enabling/disabling UI elements
+    def toggle_ui_state(self, is_enabled):
+        state = tk.NORMAL if is_enabled else tk.DISABLED
+        
+        # These buttons are always enabled when not testing
+        self.single_test_button.config(state=state)
+        self.file_test_button.config(state=state)
+        self.probe_mode_combo.config(state='readonly' if is_enabled else tk.DISABLED)
+        self.incremental_check.config(state=state)
+
+        # The Start button is managed by load_file and should be disabled after a test starts
+        if not is_enabled:
+            self.start_button.config(state=tk.DISABLED)
+
+        # Pause button is only active during a test
+        self.pause_resume_button.config(state=tk.DISABLED if is_enabled else tk.NORMAL)
+        
+        # Export buttons are only active when a test is NOT running AND there are results
+        if len(self.model) and is_enabled:
+            self.export_csv_button.config(state=tk.NORMAL)
+            self.export_txt_button.config(state=tk.NORMAL)
+        else:
+            self.export_csv_button.config(state=tk.DISABLED)
+            self.export_txt_button.config(state=tk.DISABLED)
+    # --- END FIX ---
+
+    def export_results(self, file_format):
+        if not len(self.model):
+            messagebox.showwarning(self.lang["warn_title"], self.lang["warn_no_results"]); return
+        filetypes_map = {'csv': [(self.lang["file_dialog_csv"], "*.csv")], 'txt': [(self.lang["file_dialog_txt"], "*.txt")]}
+        titles_map = {'csv': self.lang["save_csv_title"], 'txt': self.lang["save_txt_title"]}
+        filepath = filedialog.asksaveasfilename(defaultextension=f".{file_format}", filetypes=filetypes_map[file_format], title=titles_map[file_format])
+        if not filepath: return
+        try:
+            shown = len(self.shown_columns())
+            headers = [self.lang[self.column_to_lang_key[c]] for c in ResultModel.COLUMNS[:shown]]
+            data = [self.model.display_values(row, self.lang["ping_fail"])[:shown] for row in self.model]
+            if file_format == 'csv':
+                with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+                    writer = csv.writer(f); writer.writerow(headers); writer.writerows(data)
+            elif file_format == 'txt':
+                col_widths = [max(len(str(h)), *[len(str(row[i])) for row in data]) for i, h in enumerate(headers)]
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    header_line = " | ".join([h.ljust(w) for h, w in zip(headers, col_widths)])
+                    f.write(header_line + "\n" + "-" * len(header_line) + "\n")
+                    for row in data: f.write(" | ".join([str(cell).ljust(w) for cell, w in zip(row, col_widths)]) + "\n")
+            messagebox.showinfo(self.lang["info_title"], self.lang["info_export_success"])
+        except Exception as e:
+            METRICS.error('export', f"Export Error: {e}", always_print=True)
+            messagebox.showerror(self.lang["err_title"], self.lang["err_export_fail"].format(e=e))
+
+    def sort_by_column(self, col):
+        # Rows that arrive later are inserted into the model's sort index, so the order holds while a scan runs.
+        self.model.sort(col, reverse=self.sort_reverse)
+        self.view_offset = 0; self.render_view()
+        self.sort_reverse = not self.sort_reverse
+        self.reset_headings()
+        arrow = ' ▼' if self.sort_reverse else ' ▲'
+        self.tree.heading(col, text=self.lang[self.column_to_lang_key[col]] + arrow)
+
+    def reset_headings(self):
+        for c in self.tree['columns']: self.tree.heading(c, text=self.lang[self.column_to_lang_key[c]])
+
+    def show_context_menu(self, event):
+        iid = self.select_row_at(event)
+        if iid:
+            self.tree.selection_set(iid); self.context_menu.post(event.x_root, event.y_root)
+
+    def copy_to_clipboard(self, text):
+        self.root.clipboard_clear(); self.root.clipboard_append(text); self.status_var.set(self.lang["status_copied"].format(text=text))
+
+    def copy_dns(self): self.copy_to_clipboard(self.selected_result()[0])
+    def copy_ping(self): self.copy_to_clipboard(self.model.display_values(self.selected_result(), self.lang["ping_fail"])[1])
+    def copy_row(self):
+        values = self.model.display_values(self.selected_result(), self.lang["ping_fail"])[:len(self.shown_columns())]
+        self.copy_to_clipboard(", ".join(map(str, values)))
+
+
+# ==============================================================================
+#  Sharded Scan (Local Processes / Remote Nodes)
+# ==============================================================================
+# Coordinator and workers talk newline-delimited JSON over TCP:
+#   worker -> {"hello": name, "token": ...}        coordinator -> {"config": {...scanner options...}}
+#   coordinator -> {"shard": id, "targets": [...]} worker -> {"shard": id, "result": [...]} ... {"shard_done": id}
+#   coordinator -> {"done": true} once every shard has been merged.
+# Local worker processes are just workers that connect over loopback, so both deployments share one code path.
+def scanner_options(args):
+    probe_mode = 'dot' if args.dot else 'doh' if args.doh else 'dns' if args.dns_probe else 'icmp'
+    return {'probe_mode': probe_mode, 'query_names': args.query_name or list(DNS_PROBE_NAMES),
+            'timeout': args.timeout, 'use_tcp': args.tcp, 'max_in_flight': args.max_inflight, 'per_asn_limit': args.per_asn,
+            'per_prefix_limit': args.per_prefix, 'short_circuit': not args.no_short_circuit, 'port': args.port,
+            'doh_path': args.doh_path, 'tls_ca': args.tls_ca, 'tls_verify': not args.tls_insecure}
+
+def scanner_from_options(options, **kwargs):
+    encrypted_prober = None
+    if options['probe_mode'] in ENCRYPTED_PROBE_MODES:
+        pool = {key: options[key] for key in ('max_idle', 'idle_timeout', 'max_sessions') if options.get(key) is not None}
+        encrypted_prober = EncryptedDNSProber(options['probe_mode'], names=options['query_names'], timeout=options['timeout'], port=options['port'],
+                                              path=options['doh_path'], ca_file=options['tls_ca'], verify=options['tls_verify'], **pool)
+    return DNSScanner('en', probe_mode=options['probe_mode'], encrypted_prober=encrypted_prober,
+                      dns_prober=DNSProber(names=options['query_names'], timeout=options['timeout'], port=options['port'] or 53, use_tcp=options['use_tcp']),
+                      max_in_flight=options['max_in_flight'], per_asn_limit=options['per_asn_limit'],
+                      per_prefix_limit=options['per_prefix_limit'], short_circuit=options['short_circuit'], **kwargs)
+
+def _send_json(writer, message): writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+class ShardCoordinator:
+    # Hands out shards of the target stream to connected workers, merges their streamed results, and re-queues whatever
+    # a worker had not finished when its connection drops. By default each worker holds enough shards to fill its
+    # largest in-flight window.
+    def __init__(self, targets, options, token, shard_size=256, prefetch=None, max_buffered=4096):
+        self.targets = iter(targets); self.options = options; self.token = token; self.shard_size = shard_size
+        self.prefetch = prefetch or max(2, -(-options['max_in_flight'] // shard_size) + 1)
+        self.results = asyncio.Queue(max_buffered); self.requeued = collections.deque(); self.next_shard_id = 0
+        self.outstanding = 0; self.exhausted = False; self.workers = 0; self.server = None
+        self._changed = asyncio.Event(); self._finished = False
+
+    @property
+    def finished(self): return self.exhausted and not self.requeued and not self.outstanding
+
+    async def start(self, host, port):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event(); changed.set()
+
+    def _next_shard(self):
+        if self.requeued: return self.requeued.popleft()
+        if self.exhausted: return None
+        targets = list(itertools.islice(self.targets, self.shard_size))
+        if not targets: self.exhausted = True; return None
+        self.next_shard_id += 1
+        return self.next_shard_id, targets
+
+    async def _check_finished(self):
+        if self.finished and not self._finished: self._finished = True; self._notify(); await self.results.put(None)
+
+    async def _handle(self, reader, writer):
+        assigned = {}; registered = False
+        try:
+            hello = json.loads(await reader.readline() or b'{}')
+            if hello.get('token') != self.token: return
+            self.workers += 1; registered = True
+            _send_json(writer, {'config': self.options})
+            while True:
+                while len(assigned) < self.prefetch:
+                    shard = self._next_shard()
+                    if shard is None: break
+                    shard_id, targets = shard; assigned[shard_id] = collections.Counter(targets); self.outstanding += 1
+                    _send_json(writer, {'shard': shard_id, 'targets': targets})
+                await writer.drain()
+                if not assigned:
+                    await self._check_finished()
+                    if self.finished: _send_json(writer, {'done': True}); await writer.drain(); return
+                    # Nothing to hand out right now, but a shard may yet be re-queued by a dying worker.
+                    await self._changed.wait(); continue
+                line = await reader.readline()
+                if not line: return
+                message = json.loads(line)
+                if 'result' in message:
+                    pending = assigned.get(message['shard']); dns_ip = message['result'][0]
+                    if pending and pending[dns_ip]:
+                        pending[dns_ip] -= 1; await self.results.put(tuple(message['result']))
+                elif 'shard_done' in message and message['shard_done'] in assigned:
+                    del assigned[message['shard_done']]; self.outstanding -= 1
+                    await self._check_finished()
+        except (OSError, ValueError, asyncio.IncompleteReadError): pass
+        finally:
+            for shard_id, pending in assigned.items():
+                self.outstanding -= 1
+                if +pending: self.requeued.append((shard_id, list(pending.elements())))
+            if assigned: self._notify()
+            if registered: self.workers -= 1
+            writer.close()
+            await self._check_finished()
+
+    def close(self):
+        if self.server: self.server.close()
+
+def sharded_scan(targets, options, local_workers=0, listen=None, token=None, shard_size=256, store=None, max_restarts=3):
+    # Generator over merged results, in the same tuple format as DNSScanner.scan(). Dead local workers are restarted
+    # (up to `max_restarts` times each); their unfinished shards go back to the queue either way. Raises RuntimeError
+    # once every local worker has died for good while work is left and no remote worker is connected to take it.
+    loop = background_loop(); token = token or secrets.token_hex(16)
+    host, port = listen.rsplit(':', 1) if listen else ('127.0.0.1', '0')
+    async def create():
+        coordinator = ShardCoordinator(targets, options, token, shard_size=shard_size)
+        return coordinator, await coordinator.start(host.strip('[]'), int(port))
+    coordinator, bound_port = loop.run(create())
+    if listen: print(f"Coordinator listening on {host}:{bound_port} (token {token})", file=sys.stderr)
+    # Local workers connect to the address the coordinator listens on, or to loopback when that is a wildcard.
+    connect_host = {'': '127.0.0.1', '0.0.0.0': '127.0.0.1', '::': '::1'}.get(host.strip('[]'), host.strip('[]'))
+    connect = f"[{connect_host}]:{bound_port}" if ':' in connect_host else f"{connect_host}:{bound_port}"
+    command = [sys.executable, LAUNCHER, 'worker', '--connect', connect, '--token', token]
+    processes = [[subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL), 0] for _ in range(local_workers)]
+    async def next_result():
+        try: return await asyncio.wait_for(coordinator.results.get(), 1.0)
+        except asyncio.TimeoutError: return coordinator
+    try:
+        while True:
+            result = loop.run(next_result())
+            if result is None: return
+            if result is coordinator:
+                for worker in processes:
+                    if worker[0].poll() is not None and worker[1] < max_restarts:
+                        worker[0] = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL); worker[1] += 1
+                given_up = all(process.poll() is not None and restarts >= max_restarts for process, restarts in processes)
+                if processes and given_up and not coordinator.workers and not coordinator.finished:
+                    raise RuntimeError(f"all {len(processes)} local workers exited (last exit code {processes[-1][0].returncode}) "
+                                       f"after {max_restarts} restarts each, with work left and no remote worker connected")
+                continue
+            if store: store.record(result, options['probe_mode'])
+            yield result
+    finally:
+        loop.loop.call_soon_threadsafe(coordinator.close)
+        for process, _ in processes:
+            if process.poll() is None: process.terminate()
+        for process, _ in processes: process.wait()
+        if store: store.flush()
+
+async def _serve_shards(scanner, reader, writer):
+    # Every shard feeds one long-lived scheduler, so the adaptive window is not reset at each shard boundary.
+    await scanner.open_icmp_engine(); scheduler = scanner.new_scheduler(); feed = collections.deque()
+    owners = collections.defaultdict(collections.deque); remaining = {}
+    def targets():
+        while True: yield feed.popleft() if feed else ScanScheduler.IDLE
+    async def read_messages():
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: return 1
+                message = json.loads(line)
+                if message.get('done'): return 0
+                if 'shard' in message:
+                    remaining[message['shard']] = len(message['targets'])
+                    for dns_ip in message['targets']: owners[dns_ip].append(message['shard']); feed.append(dns_ip)
+                    scheduler.wake()
+        finally: scheduler.cancel()
+    reading = asyncio.ensure_future(read_messages())
+    results = scheduler.run(targets())
+    try:
+        async for result in results:
+            shard_ids = owners[result[0]]; shard_id = shard_ids.popleft()
+            if not shard_ids: del owners[result[0]]
+            _send_json(writer, {'shard': shard_id, 'result': list(result)})
+            remaining[shard_id] -= 1
+            if not remaining[shard_id]: del remaining[shard_id]; _send_json(writer, {'shard_done': shard_id})
+            await writer.drain()
+    except OSError: pass
+    finally:
+        await results.aclose(); writer.close()
+    return await reading
+
+def run_shard_worker(host, port, token, name=None, geoip_cache_path=None):
+    # One scanner (and so one set of GeoIP readers, mmap-backed) per worker process, reused for every shard.
+    loop = background_loop()
+    async def connect():
+        reader, writer = await asyncio.open_connection(host, port)
+        _send_json(writer, {'hello': name or f"{socket.gethostname()}:{os.getpid()}", 'token': token}); await writer.drain()
+        return reader, writer, json.loads(await reader.readline() or b'{}').get('config')
+    reader, writer, options = loop.run(connect())
+    if options is None: print("Coordinator rejected this worker (check --token).", file=sys.stderr); return 2
+    scanner = scanner_from_options(options, geoip_cache_path=geoip_cache_path); scanner.test_running = True
+    try: return loop.run(_serve_shards(scanner, reader, writer))
+    finally: scanner.close()
+
+# ==============================================================================
+#  Continuous Monitor
+# ==============================================================================
+LOSS_PENALTY_MS = 10.0  # ranking cost of each percent of loss, in ms of latency
+
+class ResolverStats:
+    # Rolling view of one resolver over its last `size` probes, in fixed-size arrays: a latency ring (NaN for a probe
+    # that got no reply) and a loss ring. Jitter is the RFC 3550 running mean of latency changes between probes.
+    __slots__ = ('dns_ip', 'latencies', 'losses', 'next_slot', 'probes', 'jitter', 'last_latency', 'country', 'isp', 'last_probe', 'score')
+
+    def __init__(self, dns_ip, size=32):
+        self.dns_ip = dns_ip; self.latencies = array.array('f', [math.nan]) * size; self.losses = array.array('B', bytes(size))
+        self.next_slot = 0; self.probes = 0; self.jitter = 0.0; self.last_latency = None
+        self.country = self.isp = None; self.last_probe = None; self.score = math.inf
+
+    def record(self, ping, loss, country, isp, ts=None):
+        self.latencies[self.next_slot] = math.nan if ping is None else ping; self.losses[self.next_slot] = loss
+        self.next_slot = (self.next_slot + 1) % len(self.losses); self.probes += 1
+        if ping is not None:
+            if self.last_latency is not None: self.jitter += (abs(ping - self.last_latency) - self.jitter) / 16
+            self.last_latency = ping
+        self.country = country; self.isp = isp; self.last_probe = ts or time.time()
+        p95 = self.percentile(0.95)
+        # A resolver is ranked by its bad days: p95 latency plus a fixed cost per percent of loss.
+        self.score = math.inf if p95 is None else p95 + self.loss * LOSS_PENALTY_MS
+
+    @property
+    def filled(self): return min(self.probes, len(self.losses))
+
+    @property
+    def loss(self): return sum(self.losses[:self.filled]) / self.filled if self.probes else 100.0
+
+    def percentile(self, fraction):
+        values = sorted(value for value in self.latencies[:self.filled] if value == value)
+        return values[int(fraction * (len(values) - 1))] if values else None
+
+    @property
+    def unstable(self):
+        p50 = self.percentile(0.5)
+        return p50 is not None and (self.loss > 0 or self.jitter > 0.25 * p50)
+
+    def as_dict(self):
+        p50 = self.percentile(0.5); p95 = self.percentile(0.95)
+        return {'dns': self.dns_ip, 'p50': round(p50, 2) if p50 is not None else None, 'p95': round(p95, 2) if p95 is not None else None,
+                'jitter': round(self.jitter, 2), 'loss': round(self.loss, 1), 'score': round(self.score, 2) if self.score != math.inf else None,
+                'probes': self.probes, 'location': self.country, 'isp': self.isp, 'last_probe': self.last_probe}
+
+class ResolverMonitor:
+    # Re-probes a fixed resolver list forever. Every resolver has exactly one entry in the due-time heap and at most one
+    # in the ranking, so memory is set by the list size and never grows with uptime. Each resolver's next probe is
+    # `interval` away, a quarter of that while it is unstable, half while it is in the top N, double while it has
+    # never answered, and always +-20% so probes do not fall into lockstep.
+    def __init__(self, scanner, targets, interval=300.0, top_n=20, window=32, max_in_flight=64, store=None):
+        self.scanner = scanner; self.interval = interval; self.top_n = top_n; self.max_in_flight = max_in_flight; self.store = store
+        self.stats = {}
+        for dns_ip in targets:
+            if dns_ip not in self.stats: self.stats[dns_ip] = ResolverStats(dns_ip, window)
+        self.ranking = []  # sorted (score, dns_ip) of every resolver that has answered within its window
+        self.due = []; self._in_flight = set(); self._wake = None; self.stopped = False; self.updated = None
+
+    def rank(self, dns_ip):
+        stats = self.stats[dns_ip]
+        if stats.score == math.inf: return None
+        return bisect.bisect_left(self.ranking, (stats.score, dns_ip))
+
+    def top(self, count=None): return [self.stats[dns_ip] for _, dns_ip in self.ranking[:count or self.top_n]]
+
+    def update(self, result, ts=None):
+        dns_ip, ping, loss, country, isp = result[:5]
+        stats = self.stats[dns_ip]
+        if stats.score != math.inf: del self.ranking[bisect.bisect_left(self.ranking, (stats.score, dns_ip))]
+        stats.record(ping, loss, country, isp, ts)
+        if stats.score != math.inf: bisect.insort(self.ranking, (stats.score, dns_ip))
+        self.updated = time.time()
+
+    def next_interval(self, dns_ip):
+        stats = self.stats[dns_ip]; rank = self.rank(dns_ip)
+        if rank is None: interval = self.interval * 2
+        elif stats.unstable: interval = self.interval / 4
+        elif rank < self.top_n: interval = self.interval / 2
+        else: interval = self.interval
+        return interval * random.uniform(0.8, 1.2)
+
+    def stop(self):
+        self.stopped = True
+        for task in list(self._in_flight): task.cancel()
+        if self._wake: self._wake.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop(); self._wake = asyncio.Event()
+        # The first round is spread over a few seconds instead of firing the whole list at once.
+        spread = min(self.interval, len(self.stats) / max(self.max_in_flight, 1))
+        self.due = [(loop.time() + random.uniform(0, spread), dns_ip) for dns_ip in self.stats]; heapq.heapify(self.due)
+        while not self.stopped:
+            now = loop.time()
+            while self.due and self.due[0][0] <= now and len(self._in_flight) < self.max_in_flight:
+                _, dns_ip = heapq.heappop(self.due)
+                task = asyncio.ensure_future(self.scanner.check_single_dns_async(dns_ip)); self._in_flight.add(task)
+                task.add_done_callback(lambda task, dns_ip=dns_ip: self._finished(task, dns_ip))
+            timeout = max(self.due[0][0] - now, 0) if self.due and len(self._in_flight) < self.max_in_flight else None
+            self._wake.clear()
+            try: await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError: pass
+
+    def _finished(self, task, dns_ip):
+        self._in_flight.discard(task)
+        if self.stopped: return
+        if task.cancelled(): METRICS.inc('probes_cancelled_total')
+        elif task.exception() is not None: METRICS.error('probe', f"Probe Error: {task.exception()}")
+        elif task.result() is not None:
+            self.update(task.result())
+            if self.store: self.store.record(task.result(), self.scanner.probe_mode)
+        heapq.heappush(self.due, (asyncio.get_running_loop().time() + self.next_interval(dns_ip), dns_ip))
+        self._wake.set()
+
+    def report(self, count=None):
+        return {'updated': self.updated, 'resolvers': len(self.stats), 'answering': len(self.ranking),
+                'top': [dict(stats.as_dict(), rank=rank) for rank, stats in enumerate(self.top(count), 1)]}
+
+    def write(self, path):
+        # Written to a temporary file and renamed, so readers always see a complete ranking.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+# ==============================================================================
+#  Benchmark (Simulated Resolver Farm)
+# ==============================================================================
+BENCH_SIZES = (1000, 10000, 100000)
+BENCH_FIRST_TARGET = '127.1.0.1'  # the whole 127.0.0.0/8 block is loopback, so DNS responders can answer for it
+_IP_PKTINFO = 8  # socket.IP_PKTINFO on Linux; not every Python exports the constant
+
+def _unit_hash(value):
+    # splitmix64 finaliser mapped to [0, 1): cheap, and stable across processes unlike hash().
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return (value ^ (value >> 31)) / 2.0 ** 64
+
+class SimulatedFarm:
+    # Which targets are dead and each live target's base latency are fixed by (seed, address), so every run and every
+    # commit sees the same farm; jitter and loss are drawn per reply. Times are in ms and `time_scale` multiplies
+    # every simulated wait and timeout (0.1 runs ten times faster).
+    def __init__(self, latency=50.0, jitter=10.0, loss=0.02, dead=0.1, seed=1, time_scale=1.0):
+        self.latency = latency; self.jitter = jitter; self.loss = loss; self.dead = dead; self.seed = seed
+        self.time_scale = time_scale; self.rng = random.Random(seed)
+
+    def base_latency(self, ip):
+        # None for a dead target.
+        key = (self.seed << 32) | zlib.crc32(ip.encode())
+        if _unit_hash(key) < self.dead: return None
+        return self.latency * (0.5 + _unit_hash(key ^ 0x5555555555555555))
+
+    def rtt(self, base):
+        if base is None or self.rng.random() < self.loss: return None
+        return max(0.1, self.rng.gauss(base, self.jitter))
+
+    async def ping(self, dns_ip, count=4, timeout=2.0, interval=0.2, short_circuit=False):
+        # Stands in for ICMPEngine.ping: same send pattern, same timeouts, same (avg_ms, loss_percent) result.
+        base = self.base_latency(dns_ip); timeout_ms = timeout * 1000
+        async def echo(rtt):
+            if rtt is None or rtt > timeout_ms: await asyncio.sleep(timeout * self.time_scale); return None
+            await asyncio.sleep(rtt / 1000 * self.time_scale); return rtt
+        # Dead farm hosts never answer and are never unreachable, so short_circuit does not end a probe early here.
+        waiters = [asyncio.ensure_future(echo(self.rtt(base)))]
+        for _ in range(count - 1):
+            await asyncio.sleep(interval * self.time_scale); waiters.append(asyncio.ensure_future(echo(self.rtt(base))))
+        rtts = [rtt for rtt in await asyncio.gather(*waiters) if rtt is not None]
+        return (sum(rtts) / len(rtts) if rtts else None), round((count - len(rtts)) * 100 / count)
+
+class LoopbackDNSFarm:
+    # One UDP socket answers DNS queries for every address in 127.0.0.0/8 with the farm's latency, loss and dead hosts.
+    # IP_PKTINFO reports which address a query was sent to and sends the reply from that same address, since
+    # DNSProber matches replies by (resolver, query id). Linux only.
+    def __init__(self, farm, port=0):
+        self.farm = farm; self.port = port; self.sock = None; self.loop = None; self.queries = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError: pass
+        sock.setsockopt(socket.IPPROTO_IP, _IP_PKTINFO, 1)
+        sock.bind(('0.0.0.0', self.port)); sock.setblocking(False)
+        self.sock = sock; self.port = sock.getsockname()[1]
+        self.loop.add_reader(sock.fileno(), self._on_readable)
+        return self.port
+
+    def _on_readable(self):
+        while True:
+            try: data, ancdata, _, addr = self.sock.recvmsg(512, socket.CMSG_SPACE(12))
+            except (BlockingIOError, InterruptedError): return
+            except OSError: return
+            # in_pktinfo is (ifindex, local address, header destination address).
+            target = next((socket.inet_ntoa(cdata[8:12]) for level, kind, cdata in ancdata if level == socket.IPPROTO_IP and kind == _IP_PKTINFO), None)
+            if target is None or not target.startswith('127.') or len(data) < 12: continue
+            self.queries += 1
+            rtt = self.farm.rtt(self.farm.base_latency(target))
+            if rtt is not None: self.loop.call_later(rtt / 1000 * self.farm.time_scale, self._reply, data, target, addr)
+
+    def _reply(self, query, target, addr):
+        qid, flags = struct.unpack_from('>HH', query)
+        answer = b'\xc0\x0c' + struct.pack('>HHIH', 1, 1, 60, 4) + socket.inet_aton(target)
+        response = struct.pack('>HHHHHH', qid, 0x8080 | (flags & 0x0100), 1, 1, 0, 0) + query[12:] + answer
+        source = struct.pack('=I4s4s', 0, socket.inet_aton(target), bytes(4))
+        try: self.sock.sendmsg([response], [(socket.IPPROTO_IP, _IP_PKTINFO, source)], 0, addr)
+        except OSError: pass
+
+    def close(self):
+        if self.sock: self.loop.remove_reader(self.sock.fileno()); self.sock.close(); self.sock = None
+
+class BenchScanner(DNSScanner):
+    # The real scan pipeline with per-target wall time recorded. ICMP mode pings the simulated farm instead of the
+    # network; DNS probe mode sends real queries to a LoopbackDNSFarm.
+    def __init__(self, farm, **kwargs):
+        DNSScanner.__init__(self, **kwargs)
+        self.farm = farm; self.wall_times = []
+
+    async def check_single_dns_async(self, dns_ip):
+        started = time.perf_counter()
+        result = await DNSScanner.check_single_dns_async(self, dns_ip)
+        self.wall_times.append(time.perf_counter() - started)
+        return result
+
+    async def open_icmp_engine(self): return None  # pings go to the simulated farm
+
+    async def _check_dns_quality(self, dns_ip):
+        return await self.farm.ping(dns_ip, short_circuit=self.short_circuit)
+
+def _percentile(values, fraction): return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+def peak_rss_kb():
+    try: import resource
+    except ImportError: return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_benchmark(size, farm, options):
+    # One scan of `size` farm targets through the app's own path: target loader -> scheduler -> DNSScanner.scan() ->
+    # result queue, drained on the GUI's tick into a ResultModel. Run each size in a fresh process for a clean peak RSS.
+    responder = None
+    if options['probe_mode'] == 'dns':
+        # The responder gets its own loop thread so its work is not queued behind the scanner's.
+        responder_loop = _LoopThread(); responder = LoopbackDNSFarm(farm)
+        port = responder_loop.run(responder.start())
+        prober = DNSProber(names=options['query_names'], timeout=options['timeout'] * farm.time_scale, port=port)
+    else: prober = None
+    scanner = BenchScanner(farm, probe_mode=options['probe_mode'], dns_prober=prober, max_in_flight=options['max_in_flight'],
+                           per_asn_limit=options['per_asn_limit'], per_prefix_limit=options['per_prefix_limit'],
+                           short_circuit=options['short_circuit'])
+    first = ipaddress.IPv4Address(BENCH_FIRST_TARGET)
+    targets = iter_targets([f"{first}-{first + size - 1}"])
+    results_queue = queue.Queue(); model = ResultModel(); backlog = [0]
+    def gui_ticks():
+        while True:
+            backlog[0] = max(backlog[0], results_queue.qsize())
+            results, done = drain_results(results_queue)
+            started = time.perf_counter()
+            for result in results: model.append(result)
+            if results: METRICS.observe('render', time.perf_counter() - started)
+            if done: return
+            time.sleep(GUI_TICK_MS / 1000)
+    consumer = threading.Thread(target=gui_ticks, name="bench-gui", daemon=True)
+    scanner.test_running = True; first_result = None; count = 0
+    started = time.perf_counter(); consumer.start()
+    try:
+        for result in scanner.scan(targets):
+            if first_result is None: first_result = time.perf_counter() - started
+            results_queue.put((time.perf_counter(), result)); count += 1
+        elapsed = time.perf_counter() - started
+        results_queue.put("DONE"); consumer.join(); drained = time.perf_counter() - started
+        window = scanner.scheduler.window
+    finally:
+        scanner.close()
+        if responder:
+            responder_loop.loop.call_soon_threadsafe(responder.close); responder_loop.loop.call_soon_threadsafe(responder_loop.loop.stop)
+    wall_times = sorted(scanner.wall_times)
+    return {'size': size, 'results': count, 'failed': sum(1 for row in model.rows if row[1] is None),
+            'elapsed_s': round(elapsed, 3), 'throughput_per_s': round(count / elapsed, 1) if elapsed else None,
+            'time_to_first_result_s': round(first_result, 4) if first_result is not None else None,
+            'wall_p50_ms': round(_percentile(wall_times, 0.5) * 1000, 2) if wall_times else None,
+            'wall_p99_ms': round(_percentile(wall_times, 0.99) * 1000, 2) if wall_times else None,
+            'peak_rss_kb': peak_rss_kb(), 'max_queue_backlog': backlog[0], 'gui_drained_s': round(drained, 3),
+            'final_window': round(window, 1), 'dns_queries': responder.queries if responder else None,
+            'stages': METRICS.snapshot()['stages']}
+
+def _git_revision():
+    try:
+        process = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 capture_output=True, text=True, timeout=10)
+        return process.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError): return None
+
+STARTUP_RSS_BUDGET_MB = 40
+# (name, arguments, wall time budget in ms). scan starts the probe loop, and importing asyncio alone takes ~45 ms on a
+# slow VM, so it gets more room than the commands that never touch it.
+STARTUP_COMMANDS = (('help', ['--help'], 100), ('scan', ['scan', '-', '--no-history'], 100), ('history', ['history', '--db', '{db}'], 100))
+
+# Launches a command repeatedly and prints [[wall_s, exit_code, peak_rss_kb], ...]. It runs in its own small
+# interpreter: on Linux a child's peak RSS includes the process it was forked from, which the bench process would
+# dominate. RSS needs os.wait4, which Windows lacks.
+_STARTUP_LAUNCHER = """
+import json, os, subprocess, sys, time
+command = json.loads(sys.argv[1]); samples = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0); code = os.waitstatus_to_exitcode(status)
+        rss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    else: code = process.wait(); rss = None
+    samples.append((time.perf_counter() - started, code, rss))
+print(json.dumps(samples))
+"""
+
+def _timed_runs(command, runs):
+    output = subprocess.run([sys.executable, '-c', _STARTUP_LAUNCHER, json.dumps(command), str(runs)], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, text=True, check=True).stdout
+    return json.loads(output)
+
+def run_startup_benchmark(runs=10):
+    # Wall time from launch to exit of each headless command with empty input (so nothing is probed), best and
+    # median of `runs` launches, and its peak RSS. The bare interpreter's start is reported alongside for context.
+    import tempfile
+    interpreter = min(wall for wall, _, _ in _timed_runs([sys.executable, '-c', 'pass'], runs))
+    report = {'interpreter_ms': round(interpreter * 1000, 1), 'commands': {}}
+    # Write the cached bytecode a normal first launch would leave behind (PYTHONDONTWRITEBYTECODE or a read-only
+    # install prevent that; the timings then include compiling this file).
+    import py_compile
+    try: py_compile.compile(os.path.abspath(__file__), doraise=True)
+    except (OSError, py_compile.PyCompileError): pass
+    with tempfile.TemporaryDirectory() as db_dir:
+        for name, arguments, budget_ms in STARTUP_COMMANDS:
+            command = [sys.executable, LAUNCHER] + [argument.format(db=os.path.join(db_dir, 'startup.sqlite3')) for argument in arguments]
+            samples = _timed_runs(command, runs)
+            if any(code != 0 for _, code, _ in samples): raise RuntimeError(f"'{' '.join(arguments)}' exited with an error")
+            times = sorted(wall for wall, _, _ in samples); rss = [kb for _, _, kb in samples if kb is not None]
+            report['commands'][name] = {'best_ms': round(times[0] * 1000, 1), 'median_ms': round(times[len(times) // 2] * 1000, 1),
+                                        'peak_rss_kb': max(rss) if rss else None, 'budget_ms': budget_ms}
+    return report
+
+# ==============================================================================
+#  Headless CLI
+# ==============================================================================
+RESULT_FIELDS = ('dns', 'ping', 'loss', 'location', 'isp')
+DNS_FIELDS = ('rcode', 'answers')
+TIMING_FIELDS = ('connect_ms', 'tls_ms', 'first_query_ms', 'query_ms', 'tls_resumed')
+
+def write_results(results, out, file_format, probe_mode='icmp'):
+    # Each result is written and flushed as soon as it arrives so the output can be piped into other tools.
+    # DNS/DoT/DoH scans add the rcode and answer count, DoT/DoH scans the TLSTiming columns as well; rows without a
+    # timing (timeouts before connecting) leave those empty.
+    dns_columns = probe_mode != 'icmp'; timing_columns = probe_mode in ENCRYPTED_PROBE_MODES
+    writer = csv.writer(out) if file_format == 'csv' else None
+    if writer: writer.writerow(RESULT_FIELDS + (DNS_FIELDS if dns_columns else ()) + (TIMING_FIELDS if timing_columns else ())); out.flush()
+    count = 0
+    for result in results:
+        started = time.perf_counter(); dns_ip, ping, loss, country, isp = result[:5]
+        timing = tuple(round(value, 2) if isinstance(value, float) else value for value in result[5]) if len(result) > 5 and result[5] else None
+        rcode, answers = result[6:8] if len(result) > 7 else (None, None)
+        if writer:
+            row = (dns_ip, f"{ping:.2f}" if ping is not None else "", loss, country, isp)
+            if dns_columns: row += ("" if rcode is None else rcode, "" if answers is None else answers)
+            if timing_columns: row += tuple("" if value is None else value for value in timing or (None,) * len(TIMING_FIELDS))
+            writer.writerow(row)
+        else:
+            record = dict(zip(RESULT_FIELDS, (dns_ip, round(ping, 2) if ping is not None else None, loss, country, isp)))
+            if dns_columns: record.update(rcode=rcode, answers=answers)
+            if timing_columns: record.update(zip(TIMING_FIELDS, timing or (None,) * len(TIMING_FIELDS)))
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush(); count += 1
+        METRICS.observe('output', time.perf_counter() - started)
+    return count
+
+def open_history(path):
+    # Recording history is a side job of scan and monitor: a database that cannot be opened is reported in one line
+    # and the command carries on without it, as the GUI does.
+    try: return ResultStore(path)
+    except sqlite3.Error as e: print(f"History disabled, cannot open {path}: {e}", file=sys.stderr); return None
+
+def cli_scan(args):
+    if args.shards or args.listen: return cli_sharded_scan(args)
+    store = None if args.no_history else open_history(args.db)
+    if args.incremental and not store:
+        print("--incremental needs the history database (drop --no-history, or point --db at a usable file).", file=sys.stderr)
+        return 2
+    scanner = scanner_from_options(scanner_options(args), geoip_cache_path=args.geoip_cache, store=store)
+    if args.incremental: scanner.incremental_ttl = args.ttl
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    scanner.test_running = True
+    try: write_results(scanner.scan(iter_targets(source, dedupe=not args.no_dedupe)), out, args.format, scanner.probe_mode)
+    finally:
+        scanner.close()
+        if source is not sys.stdin: source.close()
+        if out is not sys.stdout: out.close()
+    return 0
+
+def cli_sharded_scan(args):
+    if args.incremental: print("--incremental is not supported together with --shards/--listen.", file=sys.stderr); return 2
+    store = None if args.no_history else open_history(args.db)
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    options = scanner_options(args)
+    try:
+        results = sharded_scan(iter_targets(source, dedupe=not args.no_dedupe), options, local_workers=args.shards,
+                               listen=args.listen, token=args.token, shard_size=args.shard_size, store=store)
+        write_results(results, out, args.format, options['probe_mode'])
+    except RuntimeError as e: print(f"Sharded scan failed: {e}", file=sys.stderr); return 1
+    finally:
+        if store: store.close()
+        if source is not sys.stdin: source.close()
+        if out is not sys.stdout: out.close()
+    return 0
+
+def cli_worker(args):
+    host, port = args.connect.rsplit(':', 1)
+    return run_shard_worker(host.strip('[]'), int(port), args.token, name=args.name, geoip_cache_path=args.geoip_cache)
+
+def monitor_pool_options(resolvers, interval, timeout, max_in_flight):
+    # The DoT/DoH prober's defaults suit a one-off scan. A monitor comes back to each resolver about every `interval`
+    # (at most 1.2x with jitter), so idle connections have to outlive that and the pool needs room for one per
+    # resolver, or every probe pays a new handshake. Each idle connection holds a file descriptor: the soft open file
+    # limit is raised towards the hard one when the list needs it, and the pool stays below it with room for the
+    # probes in flight. TLS sessions are small, so one is kept per resolver.
+    limit = 512  # no RLIMIT_NOFILE on Windows; stay within what select() can watch
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE); wanted = resolvers + max_in_flight + 64
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            try: resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+            except (ValueError, OSError): soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        limit = wanted if soft == resource.RLIM_INFINITY else soft
+    except ImportError: pass
+    return {'max_idle': max(min(resolvers, limit - max_in_flight - 64), 0), 'idle_timeout': interval * 1.25 + timeout,
+            'max_sessions': max(resolvers, 4096)}
+
+def cli_monitor(args):
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    try: targets = list(iter_targets(source))
+    finally:
+        if source is not sys.stdin: source.close()
+    if not targets: print("No resolvers to monitor.", file=sys.stderr); return 2
+    options = scanner_options(args)
+    if options['probe_mode'] in ENCRYPTED_PROBE_MODES: options.update(monitor_pool_options(len(set(targets)), args.interval, args.timeout, args.max_inflight))
+    scanner = scanner_from_options(options, geoip_cache_path=args.geoip_cache); scanner.test_running = True
+    store = open_history(args.db) if args.history else None
+    monitor = ResolverMonitor(scanner, targets, interval=args.interval, top_n=args.top, window=args.window, max_in_flight=args.max_inflight, store=store)
+    HTTP_ROUTES['/top'] = lambda: ('application/json', json.dumps(monitor.report(), ensure_ascii=False))
+    METRICS.gauge('in_flight', lambda: len(monitor._in_flight)); METRICS.gauge('answering', lambda: len(monitor.ranking))
+    def publish():
+        if args.output == '-': print(json.dumps(monitor.report(), ensure_ascii=False), flush=True); return
+        try: monitor.write(args.output)
+        except OSError as e: METRICS.error('monitor_output', f"Output Error: {e}")
+    def terminate(signum, frame): raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, terminate)
+    loop = background_loop(); loop.submit(monitor.run())
+    print(f"Monitoring {len(monitor.stats)} resolvers every ~{args.interval:g}s; press Ctrl+C to stop.", file=sys.stderr)
+    try:
+        while True: time.sleep(args.write_interval); publish()
+    except KeyboardInterrupt: pass
+    finally:
+        loop.loop.call_soon_threadsafe(monitor.stop); publish(); scanner.close()
+        if store: store.close()
+    return 0
+
+def cli_history(args):
+    try: store = ResultStore(args.db)
+    except sqlite3.Error as e: print(f"Cannot open {args.db}: {e}", file=sys.stderr); return 1
+    since = time.time() - args.since * 3600 if args.since else None
+    try:
+        if args.latest:
+            for dns_ip, ping, loss, country, isp, ts, mode in store.latest(args.mode):
+                print(json.dumps({'dns': dns_ip, 'mode': mode, 'ping': ping, 'loss': loss, 'location': country, 'isp': isp, 'ts': ts}, ensure_ascii=False))
+        elif args.dns:
+            for dns_ip in args.dns:
+                for ts, ping, loss, mode in store.history(dns_ip, since, args.mode): print(json.dumps({'dns': dns_ip, 'mode': mode, 'ts': ts, 'ping': ping, 'loss': loss}))
+        else:
+            for dns_ip, probes, avg_ping, min_ping, max_ping, avg_loss, last_ts, mode in store.summary(since, args.mode):
+                print(json.dumps({'dns': dns_ip, 'mode': mode, 'probes': probes, 'avg_ping': avg_ping, 'min_ping': min_ping, 'max_ping': max_ping,
+                                  'avg_loss': avg_loss, 'last_ts': last_ts}))
+    finally: store.close()
+    return 0
+
+BENCH_COMPARE_FIELDS = ('throughput_per_s', 'time_to_first_result_s', 'wall_p50_ms', 'wall_p99_ms', 'peak_rss_kb', 'max_queue_backlog')
+
+def cli_bench_startup(args):
+    try: report = run_startup_benchmark(args.startup_runs)
+    except (OSError, RuntimeError, subprocess.CalledProcessError) as e: print(f"Startup benchmark failed: {e}", file=sys.stderr); return 1
+    over_budget = []
+    print(f"bare interpreter start {report['interpreter_ms']}ms", file=sys.stderr)
+    for name, run in report['commands'].items():
+        rss_mb = run['peak_rss_kb'] / 1024 if run['peak_rss_kb'] is not None else None
+        print(f"{name:>8}: {run['best_ms']}ms (median {run['median_ms']}ms), "
+              f"peak RSS {run['peak_rss_kb']} KiB", file=sys.stderr)
+        budget_ms = args.startup_budget or run['budget_ms']
+        if run['best_ms'] > budget_ms: over_budget.append(f"{name} start {run['best_ms']}ms > {budget_ms:g}ms")
+        if rss_mb is not None and rss_mb > args.rss_budget: over_budget.append(f"{name} peak RSS {rss_mb:.1f} MiB > {args.rss_budget:g} MiB")
+    report.update({'benchmark': 'DNS-CHECK.py bench --startup', 'created': time.time(), 'revision': _git_revision(),
+                   'python': platform.python_version(), 'platform': platform.platform(),
+                   'budget': {'startup_ms': args.startup_budget, 'rss_mb': args.rss_budget}, 'over_budget': over_budget})
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try: json.dump(report, out, indent=2); out.write("\n")
+    finally:
+        if out is not sys.stdout: out.close()
+    for message in over_budget: print(f"Over budget: {message}", file=sys.stderr)
+    return 1 if over_budget else 0
+
+def cli_bench(args):
+    if args.startup: return cli_bench_startup(args)
+    farm = SimulatedFarm(args.latency, args.jitter, args.loss / 100, args.dead / 100, args.seed, args.time_scale)
+    options = scanner_options(args)
+    if args.dns_probe and not sys.platform.startswith('linux'):
+        print("--dns-probe benchmarks need Linux (loopback responders for all of 127.0.0.0/8).", file=sys.stderr); return 2
+    if args.isolated_run:
+        print(json.dumps(run_benchmark(args.sizes[0], farm, options))); return 0
+    farm_config = {'latency_ms': args.latency, 'jitter_ms': args.jitter, 'loss_percent': args.loss, 'dead_percent': args.dead,
+                   'seed': args.seed, 'time_scale': args.time_scale}
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f: previous = json.load(f)
+        if previous.get('farm') != farm_config or previous.get('options') != options:
+            print(f"Note: {args.compare} was run with a different farm or options; the comparison is not like for like.", file=sys.stderr)
+        baseline = {run['size']: run for run in previous['runs']}
+    runs = []
+    for size in args.sizes:
+        # Each size runs in its own process so peak RSS and the warmed-up state of one run do not leak into the next.
+        command = [sys.executable, LAUNCHER, 'bench', '--isolated-run', '--sizes', str(size), '--latency', str(args.latency),
+                   '--jitter', str(args.jitter), '--loss', str(args.loss), '--dead', str(args.dead), '--seed', str(args.seed),
+                   '--time-scale', str(args.time_scale), '--max-inflight', str(args.max_inflight), '--timeout', str(args.timeout)]
+        if args.dns_probe: command.append('--dns-probe')
+        if args.no_short_circuit: command.append('--no-short-circuit')
+        if args.per_asn: command += ['--per-asn', str(args.per_asn)]
+        if args.per_prefix: command += ['--per-prefix', str(args.per_prefix)]
+        process = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+        if process.returncode != 0: print(f"Benchmark run for {size} targets failed.", file=sys.stderr); return 1
+        run = json.loads(process.stdout.strip().splitlines()[-1]); runs.append(run)
+        print(f"{size:>8} targets: {run['throughput_per_s']}/s, first result {run['time_to_first_result_s']}s, "
+              f"p50 {run['wall_p50_ms']}ms, p99 {run['wall_p99_ms']}ms, peak RSS {run['peak_rss_kb']} KiB, "
+              f"backlog {run['max_queue_backlog']}", file=sys.stderr)
+        old = baseline.get(size) if baseline else None
+        if old:
+            changes = [f"{field} {old[field]} -> {run[field]}" + (f" ({(run[field] - old[field]) * 100 / old[field]:+.1f}%)" if old[field] else "")
+                       for field in BENCH_COMPARE_FIELDS if old.get(field) is not None and run.get(field) is not None]
+            print("          vs baseline: " + ", ".join(changes), file=sys.stderr)
+    report = {'benchmark': 'DNS-CHECK.py bench', 'created': time.time(), 'revision': _git_revision(),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'farm': farm_config, 'options': options, 'runs': runs}
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try: json.dump(report, out, indent=2); out.write("\n")
+    finally:
+        if out is not sys.stdout: out.close()
+    return 0
+
+def add_probe_arguments(parser):
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--dns-probe', action='store_true', help="measure DNS query latency instead of ICMP ping")
+    modes.add_argument('--dot', action='store_true', help="measure DNS over TLS: TCP connect, TLS handshake, first and later query latency")
+    modes.add_argument('--doh', action='store_true', help="measure DNS over HTTPS the same way (HTTP/1.1 POST to --doh-path)")
+    parser.add_argument('--tcp', action='store_true', help="send DNS probe queries over TCP instead of UDP")
+    parser.add_argument('--query-name', action='append', metavar='NAME', help="name to resolve in DNS, DoT and DoH probe modes (repeatable)")
+    parser.add_argument('--timeout', type=float, default=2.0, help="DNS probe query timeout in seconds (default: 2)")
+    parser.add_argument('--port', type=int, metavar='PORT', help="resolver port (default: 53, DoT 853, DoH 443)")
+    parser.add_argument('--doh-path', default='/dns-query', metavar='PATH', help="DoH endpoint path (default: /dns-query)")
+    parser.add_argument('--tls-ca', metavar='FILE', help="trust only the CA certificates in FILE (e.g. a local test server's self-signed certificate)")
+    parser.add_argument('--tls-insecure', action='store_true', help="do not verify DoT/DoH certificates")
+
+def add_instrumentation_arguments(parser):
+    parser.add_argument('--metrics-listen', metavar='HOST:PORT', help="serve Prometheus metrics at /metrics (and JSON at /metrics.json)")
+    parser.add_argument('--metrics-file', metavar='FILE', help="write a JSON metrics snapshot to FILE periodically and at the end")
+    parser.add_argument('--metrics-interval', type=float, default=5.0, metavar='SECONDS', help="snapshot interval for --metrics-file (default: 5)")
+    parser.add_argument('--profile', metavar='FILE', help="sample all thread stacks during the run and write collapsed stacks (flamegraph input) to FILE")
+    parser.add_argument('--profile-interval', type=float, default=5.0, metavar='MS', help="profiler sampling interval (default: 5)")
+
+def start_instrumentation(args):
+    # Starts the metrics exports and profiler asked for on the command line; returns a function that stops them all.
+    stops = []
+    if args.metrics_listen:
+        server = serve_metrics(args.metrics_listen); stops.append(server.shutdown)
+        print(f"Metrics on http://{args.metrics_listen}/metrics", file=sys.stderr)
+    if args.metrics_file: stops.append(SnapshotWriter(args.metrics_file, args.metrics_interval).start().stop)
+    if args.profile: stops.append(SamplingProfiler(args.profile, args.profile_interval / 1000).start().stop)
+    def stop():
+        for stop_one in reversed(stops): stop_one()
+    return stop
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog='DNS-CHECK.py', description="IRNET DNS CHECKER PRO. Run without arguments to open the GUI.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND'); commands.required = True
+    scan = commands.add_parser('scan', help="probe a DNS list and stream each result as soon as it completes")
+    scan.add_argument('input', nargs='?', default='-', help="DNS list file (IPs, IPv6, CIDR blocks, a-b ranges, '#' comments), or - for stdin (default)")
+    scan.add_argument('--no-dedupe', action='store_true', help="probe repeated targets again instead of skipping them")
+    scan.add_argument('-o', '--output', default='-', help="output file, or - for stdout (default)")
+    scan.add_argument('-f', '--format', choices=('ndjson', 'csv'), default='ndjson', help="output format (default: ndjson)")
+    scan.add_argument('--max-inflight', type=int, default=1024, metavar='N', help="upper bound for the adaptive in-flight window (default: 1024)")
+    scan.add_argument('--per-asn', type=int, metavar='N', help="at most N probes in flight per ASN")
+    scan.add_argument('--per-prefix', type=int, metavar='N', help="at most N probes in flight per /24 (IPv6: /48)")
+    scan.add_argument('--no-short-circuit', action='store_true', help="always send every probe, even when the first one is refused or unreachable")
+    add_probe_arguments(scan)
+    scan.add_argument('--geoip-cache', metavar='FILE', help="persistent GeoIP cache file, reused until the .mmdb build changes")
+    scan.add_argument('--db', default=DEFAULT_HISTORY_DB, metavar='FILE', help="result history database (default: dns-history.sqlite3 next to this script)")
+    scan.add_argument('--no-history', action='store_true', help="do not record results in the history database")
+    scan.add_argument('--incremental', action='store_true', help="re-probe only resolvers whose last result is older than --ttl or failed; emit the rest from history")
+    scan.add_argument('--ttl', type=float, default=3600, metavar='SECONDS', help="freshness window for --incremental (default: 3600)")
+    scan.add_argument('--shards', type=int, default=0, metavar='N', help="split the scan across N local worker processes")
+    scan.add_argument('--listen', metavar='HOST:PORT', help="also accept remote workers ('DNS-CHECK.py worker --connect') on this address")
+    scan.add_argument('--token', help="shared secret remote workers must present (generated and printed if omitted)")
+    scan.add_argument('--shard-size', type=int, default=256, metavar='N', help="targets per shard handed to a worker (default: 256)")
+    add_instrumentation_arguments(scan)
+    scan.set_defaults(func=cli_scan)
+    worker = commands.add_parser('worker', help="serve shards for a coordinator started with 'scan --shards/--listen'")
+    worker.add_argument('--connect', required=True, metavar='HOST:PORT', help="coordinator address")
+    worker.add_argument('--token', required=True, help="the coordinator's shared secret")
+    worker.add_argument('--name', help="node name reported to the coordinator (default: host:pid)")
+    worker.add_argument('--geoip-cache', metavar='FILE', help="persistent GeoIP cache file for this node")
+    add_instrumentation_arguments(worker)
+    worker.set_defaults(func=cli_worker)
+    bench = commands.add_parser('bench', help="benchmark the scan pipeline against a simulated resolver farm")
+    bench.add_argument('--sizes', type=int, nargs='+', default=list(BENCH_SIZES), metavar='N', help="target counts to run (default: 1000 10000 100000)")
+    bench.add_argument('-o', '--output', default='-', help="JSON report file, or - for stdout (default)")
+    bench.add_argument('--compare', metavar='FILE', help="earlier report to print per-size changes against")
+    bench.add_argument('--latency', type=float, default=50.0, metavar='MS', help="mean base latency of live targets (default: 50)")
+    bench.add_argument('--jitter', type=float, default=10.0, metavar='MS', help="per-reply latency standard deviation (default: 10)")
+    bench.add_argument('--loss', type=float, default=2.0, metavar='PERCENT', help="per-reply loss on live targets (default: 2)")
+    bench.add_argument('--dead', type=float, default=10.0, metavar='PERCENT', help="share of targets that never answer (default: 10)")
+    bench.add_argument('--seed', type=int, default=1, help="farm seed; the same seed gives the same farm (default: 1)")
+    bench.add_argument('--time-scale', type=float, default=1.0, metavar='F', help="multiply every simulated delay and timeout by F (default: 1)")
+    bench.add_argument('--dns-probe', action='store_true', help="send real DNS queries to loopback responders instead of simulating ping")
+    bench.add_argument('--timeout', type=float, default=2.0, help="DNS probe query timeout in seconds, before --time-scale (default: 2)")
+    bench.add_argument('--max-inflight', type=int, default=1024, metavar='N', help="upper bound for the adaptive in-flight window (default: 1024)")
+    bench.add_argument('--per-asn', type=int, metavar='N', help="at most N probes in flight per ASN")
+    bench.add_argument('--per-prefix', type=int, metavar='N', help="at most N probes in flight per /24")
+    bench.add_argument('--no-short-circuit', action='store_true', help="always send every probe, even when the first one is refused or unreachable")
+    bench.add_argument('--startup', action='store_true', help="measure startup time and baseline RSS of the headless commands instead; exits 1 when over budget")
+    bench.add_argument('--startup-runs', type=int, default=10, metavar='N', help="launches per command for --startup (default: 10)")
+    bench.add_argument('--startup-budget', type=float, metavar='MS', help="allowed wall time from launch to exit for every --startup command (default: 100)")
+    bench.add_argument('--rss-budget', type=float, default=STARTUP_RSS_BUDGET_MB, metavar='MB', help=f"allowed peak RSS per command for --startup (default: {STARTUP_RSS_BUDGET_MB})")
+    bench.add_argument('--isolated-run', action='store_true', help=argparse.SUPPRESS)
+    bench.set_defaults(func=cli_bench, query_name=None, tcp=False, dot=False, doh=False, port=None, doh_path='/dns-query', tls_ca=None, tls_insecure=False)
+    monitor = commands.add_parser('monitor', help="keep re-probing a DNS list and maintain a live best-N ranking")
+    monitor.add_argument('input', nargs='?', default='-', help="DNS list file, or - for stdin (default)")
+    monitor.add_argument('--interval', type=float, default=300.0, metavar='SECONDS', help="base re-probe interval per resolver; unstable ones are probed 4x and top-ranked ones 2x as often (default: 300)")
+    monitor.add_argument('--top', type=int, default=20, metavar='N', help="size of the published ranking (default: 20)")
+    monitor.add_argument('--window', type=int, default=32, metavar='N', help="probes kept per resolver for percentiles, jitter and loss (default: 32)")
+    monitor.add_argument('--max-inflight', type=int, default=64, metavar='N', help="probes in flight at once (default: 64)")
+    monitor.add_argument('-o', '--output', default='-', help="ranking file, rewritten atomically; - prints one JSON report per line to stdout (default)")
+    monitor.add_argument('--write-interval', type=float, default=10.0, metavar='SECONDS', help="how often the ranking is published (default: 10)")
+    monitor.add_argument('--no-short-circuit', action='store_true', help="always send every probe, even when the first one is refused or unreachable")
+    add_probe_arguments(monitor)
+    monitor.add_argument('--geoip-cache', metavar='FILE', help="persistent GeoIP cache file")
+    monitor.add_argument('--history', action='store_true', help="also record every probe in the history database")
+    monitor.add_argument('--db', default=DEFAULT_HISTORY_DB, metavar='FILE', help="history database for --history")
+    add_instrumentation_arguments(monitor)
+    monitor.set_defaults(func=cli_monitor, per_asn=None, per_prefix=None)
+    history = commands.add_parser('history', help="query recorded results without rescanning")
+    history.add_argument('dns', nargs='*', help="print every recorded probe for these resolvers (default: per-resolver summary)")
+    history.add_argument('--latest', action='store_true', help="print the last known result of every resolver")
+    history.add_argument('--since', type=float, metavar='HOURS', help="only consider probes from the last HOURS hours")
+    history.add_argument('--mode', choices=('icmp', 'dns') + ENCRYPTED_PROBE_MODES, help="only results of this probe type (default: all, one entry per type)")
+    history.add_argument('--db', default=DEFAULT_HISTORY_DB, metavar='FILE', help="result history database")
+    history.set_defaults(func=cli_history)
+    args = parser.parse_args(argv)
+    stop_instrumentation = start_instrumentation(args) if args.command in ('scan', 'worker', 'monitor') else None
+    try: return args.func(args)
+    except KeyboardInterrupt: return 130
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); point stdout at devnull so the interpreter exits quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if stop_instrumentation: stop_instrumentation()
+
+def main():
+    if len(sys.argv) > 1: sys.exit(run_cli(sys.argv[1:]))
+    _load_tk()
+    root = tk.Tk()
+    root.withdraw()
+    lang_selector = tk.Toplevel(root)
+    lang_selector.title(I18N['en']["select_lang_title"])
+    lang_selector.geometry("300x120")
+    lang_selector.resizable(False, False)
+    lang_selector.update_idletasks()
+    width = lang_selector.winfo_width(); height = lang_selector.winfo_height()
+    x = (lang_selector.winfo_screenwidth() // 2) - (width // 2); y = (lang_selector.winfo_screenheight() // 2) - (height // 2)
+    lang_selector.geometry(f'{width}x{height}+{x}+{y}')
+    def start_main_app(lang_code):
+        lang_selector.destroy(); root.deiconify(); DNSCheckerApp(root, lang_code)
+    ttk.Label(lang_selector, text=I18N['en']["select_lang_title"], font=('Arial', 12)).pack(pady=10)
+    ttk.Button(lang_selector, text=I18N['en']["lang_button_en"], command=lambda: start_main_app('en')).pack(pady=5, padx=20, fill='x')
+    ttk.Button(lang_selector, text=I18N['fa']["lang_button_fa"], command=lambda: start_main_app('fa')).pack(pady=5, padx=20, fill='x')
+    def on_lang_selector_close(): root.destroy()
+    lang_selector.protocol("WM_DELETE_WINDOW", on_lang_selector_close)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
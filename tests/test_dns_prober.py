@@ -0,0 +1,77 @@
+import asyncio
+import struct
+
+import dnscheck
+
+ANSWER = struct.pack('>HHHIH', 0xC00C, 1, 1, 60, 4) + bytes([192, 0, 2, 1])
+
+def stub_reply(query, rcode=0, answers=1):
+    qid, flags = struct.unpack_from('>HH', query)
+    return struct.pack('>HHHHHH', qid, 0x8080 | (flags & 0x0100) | rcode, 1, answers, 0, 0) + query[12:] + ANSWER * answers
+
+class StubUDP:
+    def __init__(self, **reply): self.reply = reply; self.transport = None
+    def connection_made(self, transport): self.transport = transport
+    def datagram_received(self, data, addr):
+        if self.reply.get('silent'): return
+        self.transport.sendto(stub_reply(data, **self.reply), addr)
+    def error_received(self, exc): pass
+    def connection_lost(self, exc): pass
+
+async def probe_udp(short_circuit=False, **reply):
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(lambda: StubUDP(**reply), local_addr=('127.0.0.1', 0))
+    prober = dnscheck.DNSProber(timeout=0.3, port=transport.get_extra_info('sockname')[1])
+    try: return await prober.probe('127.0.0.1', short_circuit=short_circuit)
+    finally: prober.close(); transport.close()
+
+async def probe_tcp(**reply):
+    async def handle(reader, writer):
+        try:
+            while True:
+                length = struct.unpack('>H', await reader.readexactly(2))[0]
+                response = stub_reply(await reader.readexactly(length), **reply)
+                writer.write(struct.pack('>H', len(response)) + response); await writer.drain()
+        except asyncio.IncompleteReadError: pass
+        finally: writer.close()
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    prober = dnscheck.DNSProber(timeout=0.3, port=server.sockets[0].getsockname()[1], use_tcp=True)
+    try: return await prober.probe('127.0.0.1')
+    finally: server.close()
+
+def test_udp_noerror_with_answers_is_a_success():
+    result = asyncio.run(probe_udp())
+    assert result.loss == 0 and result.latency is not None
+    assert result.rcode == 'NOERROR' and result.answers == len(dnscheck.DNS_PROBE_NAMES)
+
+def test_tcp_noerror_with_answers_is_a_success():
+    result = asyncio.run(probe_tcp())
+    assert result.loss == 0 and result.latency is not None and result.rcode == 'NOERROR'
+
+def test_refused_counts_as_loss():
+    for result in (asyncio.run(probe_udp(rcode=5, answers=0)), asyncio.run(probe_tcp(rcode=5, answers=0))):
+        assert result.loss == 100 and result.latency is None
+        assert result.rcode == 'REFUSED' and result.timeouts == 0
+
+def test_noerror_without_answers_counts_as_loss():
+    result = asyncio.run(probe_udp(answers=0))
+    assert result.loss == 100 and result.latency is None
+    assert result.rcode == 'NOERROR' and result.answers == 0
+
+def test_silent_resolver_times_out():
+    result = asyncio.run(probe_udp(silent=True))
+    assert result.loss == 100 and result.latency is None and result.rcode is None
+    assert result.timeouts == result.queries == len(dnscheck.DNS_PROBE_NAMES)
+
+def test_socket_error_is_reported_as_a_timeout():
+    async def no_socket(family): raise OSError("address family not supported")
+    prober = dnscheck.DNSProber(timeout=0.3); prober._protocol = no_socket
+    assert asyncio.run(prober.query_udp('2001:db8::1', 'example.com')) is None
+    assert asyncio.run(prober.probe('2001:db8::1')).loss == 100
+
+def test_short_circuit_skips_the_rest_after_refused():
+    result = asyncio.run(probe_udp(short_circuit=True, rcode=5, answers=0))
+    assert result.queries == 1 and result.loss == 100 and result.rcode == 'REFUSED'
+
+def test_short_circuit_keeps_querying_after_a_timeout():
+    result = asyncio.run(probe_udp(short_circuit=True, silent=True))
+    assert result.queries == len(dnscheck.DNS_PROBE_NAMES) and result.loss == 100
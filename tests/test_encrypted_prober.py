@@ -0,0 +1,109 @@
+import asyncio
+import shutil
+import ssl
+import struct
+import subprocess
+
+import pytest
+
+import dnscheck
+
+ANSWER = struct.pack('>HHHIH', 0xC00C, 1, 1, 60, 4) + bytes([192, 0, 2, 1])
+
+@pytest.fixture(scope='module')
+def certificate(tmp_path_factory):
+    if not shutil.which('openssl'): pytest.skip("needs the openssl command to make a test certificate")
+    directory = tmp_path_factory.mktemp('tls'); cert = directory / 'cert.pem'; key = directory / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', str(key), '-out', str(cert), '-days', '1',
+                    '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'], check=True, capture_output=True)
+    return str(cert), str(key)
+
+class StubResolver:
+    # DoT and DoH on 127.0.0.1 that answer every query with one A record (or `rcode` and no answers). A DoT connection
+    # left idle for `idle_close` seconds is closed, and with `close` every DoH response carries `Connection: close`.
+    def __init__(self, certificate, rcode=0, idle_close=None, close=False):
+        self.context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH); self.context.load_cert_chain(*certificate)
+        self.context.set_alpn_protocols(['dot', 'http/1.1']); self.rcode = rcode; self.connections = 0
+        self.idle_close = idle_close; self.close = close
+
+    def reply(self, query):
+        answers = 0 if self.rcode else 1
+        return query[:2] + struct.pack('>HHHHH', 0x8180 | self.rcode, 1, answers, 0, 0) + query[12:] + ANSWER * answers
+
+    async def dot(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                length = struct.unpack('>H', await asyncio.wait_for(reader.readexactly(2), self.idle_close))[0]
+                response = self.reply(await reader.readexactly(length))
+                writer.write(struct.pack('>H', len(response)) + response); await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, OSError): pass
+        finally: writer.close()
+
+    async def doh(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').lower()
+                length = int(head.split('content-length:', 1)[1].split("\r\n", 1)[0])
+                response = self.reply(await reader.readexactly(length))
+                close = b"Connection: close\r\n" if self.close else b""
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/dns-message\r\n%sContent-Length: %d\r\n\r\n" % (close, len(response)) + response)
+                await writer.drain()
+                if self.close: break
+        except (asyncio.IncompleteReadError, OSError): pass
+        finally: writer.close()
+
+    async def start(self, protocol):
+        self.server = await asyncio.start_server(self.dot if protocol == 'dot' else self.doh, '127.0.0.1', 0, ssl=self.context)
+        return self.server.sockets[0].getsockname()[1]
+
+def run_probes(certificate, protocol, count, rcode=0, between=None, pause=0, **server):
+    async def main():
+        resolver = StubResolver(certificate, rcode, **server); port = await resolver.start(protocol)
+        prober = dnscheck.EncryptedDNSProber(protocol, timeout=2.0, port=port, ca_file=certificate[0])
+        results = []
+        try:
+            for _ in range(count):
+                results.append(await prober.probe('127.0.0.1'))
+                if between: between(prober)
+                await asyncio.sleep(pause)
+        finally: prober.close(); resolver.server.close()
+        return results, resolver.connections
+    return asyncio.run(main())
+
+@pytest.mark.parametrize('protocol', dnscheck.ENCRYPTED_PROBE_MODES)
+def test_second_probe_reuses_the_idle_connection(certificate, protocol):
+    (first, second), connections = run_probes(certificate, protocol, 2)
+    assert connections == 1
+    assert first.loss == 0 and first.timing.connect_ms is not None and first.timing.handshake_ms is not None
+    assert second.loss == 0 and second.timing.connect_ms is None and second.timing.handshake_ms is None
+
+@pytest.mark.parametrize('protocol', dnscheck.ENCRYPTED_PROBE_MODES)
+def test_new_connection_resumes_the_tls_session(certificate, protocol):
+    # Dropping the idle connections keeps the stored sessions, so the next probe reconnects with an abbreviated handshake.
+    (first, second), connections = run_probes(certificate, protocol, 2, between=lambda prober: prober.close())
+    assert connections == 2
+    assert first.timing.resumed is False and second.timing.resumed is True
+
+def test_connection_closed_by_an_idle_dot_server_is_replaced(certificate):
+    (first, second), connections = run_probes(certificate, 'dot', 2, pause=0.5, idle_close=0.3)
+    assert connections == 2 and first.loss == 0 and second.loss == 0
+    assert second.timing.connect_ms is not None and second.timing.resumed is True
+
+def test_doh_connection_close_reconnects_for_every_name(certificate):
+    (first, second), connections = run_probes(certificate, 'doh', 2, close=True)
+    assert connections == 2 * len(dnscheck.DNS_PROBE_NAMES)
+    assert first.loss == 0 and second.loss == 0 and second.timing.resumed is True
+
+@pytest.mark.parametrize('protocol', dnscheck.ENCRYPTED_PROBE_MODES)
+def test_refused_counts_as_loss(certificate, protocol):
+    (result,), _ = run_probes(certificate, protocol, 1, rcode=5)
+    assert result.loss == 100 and result.latency is None
+    assert result.rcode == 'REFUSED' and result.answers == 0 and result.timeouts == 0
+    assert result.timing.first_ms is not None
+
+def test_monitor_pool_outlives_the_reprobe_interval():
+    options = dnscheck.monitor_pool_options(3000, 300.0, 2.0, 64)
+    assert options['idle_timeout'] > 300.0 * 1.2
+    assert 0 < options['max_idle'] <= 3000 and options['max_sessions'] >= 3000
@@ -0,0 +1,63 @@
+import ipaddress
+
+import pytest
+
+import dnscheck
+
+class FakeReader:
+    # Stands in for a maxminddb reader: (record, prefix length) of the network holding an address.
+    def __init__(self, networks, epoch=1):
+        self.networks = [(ipaddress.ip_network(network), record) for network, record in networks.items()]
+        self.epoch = epoch; self.lookups = 0
+
+    def get_with_prefix_len(self, address):
+        self.lookups += 1
+        for network, record in self.networks:
+            if address in network: return record, network.prefixlen
+        return None, 16 if address.version == 4 else 32
+
+    def metadata(self): return type('Metadata', (), {'build_epoch': self.epoch})()
+
+def city(country): return {'country': {'names': {'en': country}}}
+def asn(number, name): return {'autonomous_system_number': number, 'autonomous_system_organization': name}
+
+@pytest.fixture
+def readers(monkeypatch):
+    readers = {'city': FakeReader({'192.0.2.0/24': city('Germany'), '198.51.100.0/24': city('France'), '203.0.113.0/24': city('Spain'),
+                                   '2001:db8::/32': city('Japan')}),
+               'asn': FakeReader({'192.0.0.0/22': asn(64500, 'Example'), '2001:db8::/48': asn(64501, 'Example v6')})}
+    monkeypatch.setattr(dnscheck, 'geoip_reader', lambda path: readers[path])
+    return readers
+
+def test_one_lookup_answers_the_whole_network(readers):
+    cache = dnscheck.GeoIPCache('city', 'asn')
+    assert cache.lookup('192.0.2.1') == ('Germany', 'Example', 64500)
+    assert cache.lookup('192.0.2.254') == ('Germany', 'Example', 64500)
+    assert (cache.hits, cache.misses, readers['city'].lookups) == (1, 1, 1)
+    # The entry covers the narrower of the two networks only: 192.0.3.0/24 is the same AS but not the same city network.
+    assert cache.lookup('192.0.3.1') == ('N/A', 'Example', 64500) and cache.misses == 2
+    assert cache.lookup('2001:db8::1') == ('Japan', 'Example v6', 64501)
+    assert cache.lookup(ipaddress.ip_address('2001:db8::ffff')) == ('Japan', 'Example v6', 64501) and cache.hits == 2
+
+def test_least_recently_used_network_is_evicted(readers):
+    cache = dnscheck.GeoIPCache('city', 'asn', max_entries=2)
+    cache.lookup('192.0.2.1'); cache.lookup('198.51.100.1'); cache.lookup('192.0.2.2'); cache.lookup('203.0.113.1')
+    assert cache.hits == 1 and len(cache.entries) == 2
+    cache.lookup('192.0.2.3'); assert cache.hits == 2
+    cache.lookup('198.51.100.2'); assert cache.hits == 2 and cache.misses == 4
+
+def test_prefix_lengths_follow_the_entries(readers):
+    cache = dnscheck.GeoIPCache('city', 'asn', max_entries=2)
+    cache.lookup('192.0.2.1'); cache.lookup('2001:db8::1')
+    assert cache.prefix_lengths == {4: {24: 1}, 6: {48: 1}}
+    cache.lookup('198.51.100.1'); cache.lookup('203.0.113.1')
+    assert cache.prefix_lengths == {4: {24: 2}, 6: {}}
+
+def test_saved_cache_is_only_loaded_for_the_same_database_build(readers, tmp_path):
+    path = str(tmp_path / 'geoip-cache.json')
+    cache = dnscheck.GeoIPCache('city', 'asn', path=path); cache.lookup('192.0.2.1'); cache.save()
+    loaded = dnscheck.GeoIPCache('city', 'asn', path=path)
+    assert loaded.lookup('192.0.2.9') == ('Germany', 'Example', 64500) and loaded.hits == 1
+    readers['asn'].epoch = 2
+    rebuilt = dnscheck.GeoIPCache('city', 'asn', path=path)
+    assert rebuilt.lookup('192.0.2.9') == ('Germany', 'Example', 64500) and rebuilt.hits == 0 and rebuilt.misses == 1
@@ -0,0 +1,72 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+import dnscheck
+
+def unreachable_reply(ident, seq, target='192.0.2.7'):
+    # Type 3 (destination unreachable), quoting our IPv4 header and echo request header.
+    quoted_ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 36, 0, 0, 64, 1, 0, socket.inet_aton('192.0.2.1'), socket.inet_aton(target))
+    return struct.pack('>BBHI', 3, 1, 0, 0) + quoted_ip + struct.pack('>BBHHH', 8, 0, 0, ident, seq)
+
+def test_unreachable_reply_resolves_the_matching_echo():
+    async def main():
+        engine = dnscheck.ICMPEngine(asyncio.get_running_loop(), {})
+        waiter = asyncio.get_running_loop().create_future(); engine.pending[('192.0.2.7', 42)] = (waiter, 0.0)
+        engine._on_unreachable(socket.AF_INET, unreachable_reply(engine.ident ^ 1, 42))
+        assert not waiter.done()  # someone else's echo
+        engine._on_unreachable(socket.AF_INET, unreachable_reply(engine.ident, 42))
+        return await waiter
+    assert asyncio.run(main()) is dnscheck.UNREACHABLE
+
+def ping_with_replies(replies, short_circuit):
+    async def main():
+        engine = dnscheck.ICMPEngine(asyncio.get_running_loop(), {}); sent = []
+        def send(ip, family, timeout):
+            waiter = asyncio.get_running_loop().create_future(); waiter.set_result(replies[len(sent)]); sent.append(ip); return waiter
+        engine._send = send
+        return await engine.ping('192.0.2.7', interval=0.001, short_circuit=short_circuit), len(sent)
+    return asyncio.run(main())
+
+def test_short_circuit_stops_after_an_unreachable_first_echo():
+    assert ping_with_replies([dnscheck.UNREACHABLE] * 4, short_circuit=True) == ((None, 100), 1)
+
+def test_short_circuit_keeps_probing_after_a_lost_first_echo():
+    (latency, loss), sent = ping_with_replies([None, 10.0, 20.0, 30.0], short_circuit=True)
+    assert sent == 4 and latency == 20.0 and loss == 25
+
+def run_with_engine(coroutine_function):
+    async def main():
+        engine = await dnscheck.ICMPEngine.open()
+        if engine is None: return None
+        try: return await coroutine_function(engine)
+        finally: engine.close()
+    result = asyncio.run(main())
+    if result is None: pytest.skip("no ICMP socket available (needs raw socket or ping_group_range permission)")
+    return result
+
+def test_pings_loopback():
+    async def ping(engine): return await engine.ping('127.0.0.1', timeout=1.0, interval=0.01)
+    latency, loss = run_with_engine(ping)
+    assert loss == 0 and 0 <= latency < 1000
+
+def test_many_concurrent_pings_share_one_socket():
+    async def ping(engine):
+        return await asyncio.gather(*(engine.ping(f'127.0.0.{host}', count=2, timeout=1.0, interval=0.01) for host in range(1, 51))), len(engine.sockets)
+    results, sockets = run_with_engine(ping)
+    assert all(loss == 0 for _, loss in results) and sockets <= 2
+
+class Blackhole(socket.socket):
+    # Swallows every echo request, like a host that never answers.
+    def sendto(self, data, address): return len(data)
+
+def test_unanswered_echoes_time_out_as_loss():
+    async def main():
+        sock = Blackhole(socket.AF_INET, socket.SOCK_DGRAM); sock.setblocking(False)
+        engine = dnscheck.ICMPEngine(asyncio.get_running_loop(), {socket.AF_INET: (sock, True)})
+        try: return await engine.ping('192.0.2.1', count=3, timeout=0.05, interval=0.01), engine.pending
+        finally: engine.close()
+    result, pending = asyncio.run(main())
+    assert result == (None, 100) and not pending
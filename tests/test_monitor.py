@@ -0,0 +1,75 @@
+import json
+import math
+
+import pytest
+
+import dnscheck
+
+def monitor(targets=('192.0.2.1', '192.0.2.2', '192.0.2.3', '192.0.2.4'), **kwargs):
+    return dnscheck.ResolverMonitor(None, targets, **kwargs)
+
+def test_ring_buffers_keep_only_the_last_window():
+    stats = dnscheck.ResolverStats('192.0.2.1', size=4)
+    for ping in range(1, 7): stats.record(float(ping), 0, 'N/A', 'N/A')
+    assert sorted(stats.latencies) == [3.0, 4.0, 5.0, 6.0] and stats.filled == 4 and stats.probes == 6
+    assert stats.percentile(0.0) == 3.0 and stats.percentile(1.0) == 6.0
+
+def test_percentile_skips_probes_without_a_reply():
+    stats = dnscheck.ResolverStats('192.0.2.1', size=16)
+    for ping in range(1, 11): stats.record(float(ping), 0, 'N/A', 'N/A')
+    stats.record(None, 100, 'N/A', 'N/A')
+    assert stats.percentile(0.5) == 5.0 and stats.percentile(0.95) == 9.0
+    assert dnscheck.ResolverStats('192.0.2.2').percentile(0.5) is None
+
+def test_loss_is_averaged_over_the_filled_part_of_the_window():
+    stats = dnscheck.ResolverStats('192.0.2.1', size=32)
+    assert stats.loss == 100.0
+    stats.record(10.0, 0, 'N/A', 'N/A'); stats.record(None, 100, 'N/A', 'N/A')
+    assert stats.loss == 50.0 and stats.unstable
+    assert stats.score == 10.0 + 50.0 * dnscheck.LOSS_PENALTY_MS
+
+def test_ranking_follows_score_changes():
+    resolvers = monitor(window=1)
+    for dns_ip, ping in (('192.0.2.1', 30.0), ('192.0.2.2', 10.0), ('192.0.2.3', 20.0)): resolvers.update((dns_ip, ping, 0, 'N/A', 'N/A'))
+    assert [stats.dns_ip for stats in resolvers.top()] == ['192.0.2.2', '192.0.2.3', '192.0.2.1']
+    resolvers.update(('192.0.2.1', 5.0, 0, 'N/A', 'N/A'))
+    assert resolvers.rank('192.0.2.1') == 0 and len(resolvers.ranking) == 3
+    # With a one-probe window a timeout leaves nothing to rank the resolver by.
+    resolvers.update(('192.0.2.2', None, 100, 'N/A', 'N/A'))
+    assert resolvers.rank('192.0.2.2') is None and resolvers.ranking == [(5.0, '192.0.2.1'), (20.0, '192.0.2.3')]
+    assert resolvers.rank('192.0.2.4') is None
+
+def test_next_interval_tiers(monkeypatch):
+    monkeypatch.setattr(dnscheck.random, 'uniform', lambda low, high: 1.0)
+    resolvers = monitor(interval=100.0, top_n=1)
+    resolvers.update(('192.0.2.1', 10.0, 0, 'N/A', 'N/A')); resolvers.update(('192.0.2.2', 20.0, 0, 'N/A', 'N/A'))
+    resolvers.update(('192.0.2.3', 5.0, 50, 'N/A', 'N/A'))
+    assert resolvers.next_interval('192.0.2.1') == 50.0    # in the top N
+    assert resolvers.next_interval('192.0.2.2') == 100.0   # answering, outside the top N
+    assert resolvers.next_interval('192.0.2.3') == 25.0    # unstable
+    assert resolvers.next_interval('192.0.2.4') == 200.0   # never answered
+
+def test_next_interval_is_jittered():
+    resolvers = monitor(interval=100.0)
+    assert all(160.0 <= resolvers.next_interval('192.0.2.1') <= 240.0 for _ in range(100))
+
+def test_memory_stays_fixed_past_the_window():
+    resolvers = monitor(window=8); stats = resolvers.stats['192.0.2.1']
+    sizes = (len(stats.latencies), len(stats.losses))
+    for n in range(1000): resolvers.update(('192.0.2.1', float(n % 50), n % 2 * 100, 'N/A', 'N/A'))
+    assert (len(stats.latencies), len(stats.losses)) == sizes == (8, 8)
+    assert stats.probes == 1000 and len(resolvers.ranking) == 1 and len(resolvers.stats) == 4
+    assert math.isfinite(stats.score)
+
+def test_write_replaces_the_report_atomically(tmp_path, monkeypatch):
+    path = tmp_path / 'ranking.json'; resolvers = monitor()
+    resolvers.update(('192.0.2.1', 10.0, 0, 'DE', 'Example'))
+    resolvers.write(path)
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert report['answering'] == 1 and report['top'][0]['dns'] == '192.0.2.1' and report['top'][0]['rank'] == 1
+    assert [entry.name for entry in tmp_path.iterdir()] == ['ranking.json']
+    # A write that fails part-way leaves the previous report in place.
+    def broken(count=None): raise RuntimeError("interrupted")
+    monkeypatch.setattr(resolvers, 'report', broken)
+    with pytest.raises(RuntimeError): resolvers.write(path)
+    assert json.loads(path.read_text(encoding='utf-8')) == report
@@ -0,0 +1,54 @@
+import math
+
+import dnscheck
+
+def icmp(dns_ip, ping, loss=0): return (dns_ip, ping, loss, 'N/A', 'N/A')
+
+def model_of(*results):
+    model = dnscheck.ResultModel()
+    for result in results: model.append(result)
+    return model
+
+def shown(model): return [row[0] for row in model]
+
+def test_sort_index_is_kept_while_rows_arrive():
+    model = model_of(icmp('192.0.2.1', 30.0), icmp('192.0.2.2', 10.0))
+    model.sort('avg_ping')
+    model.append(icmp('192.0.2.3', 20.0)); model.append(icmp('192.0.2.4', 5.0)); model.append(icmp('192.0.2.5', 20.0))
+    # Equal pings keep their arrival order.
+    assert shown(model) == ['192.0.2.4', '192.0.2.2', '192.0.2.3', '192.0.2.5', '192.0.2.1']
+    assert model._keys == sorted(model._keys) and len(model._order) == len(model)
+
+def test_row_index_with_reverse_sort():
+    model = model_of(icmp('192.0.2.1', 30.0), icmp('192.0.2.2', 10.0), icmp('192.0.2.3', 20.0))
+    model.sort('avg_ping', reverse=True)
+    assert [model.row_index(position) for position in range(3)] == [0, 2, 1]
+    model.append(icmp('192.0.2.4', 40.0))
+    assert model.row_index(0) == 3 and model.row_at(3)[0] == '192.0.2.2'
+
+def test_missing_and_infinite_pings_sort_last():
+    model = model_of(icmp('192.0.2.1', None, 100), icmp('192.0.2.2', 10.0), icmp('192.0.2.3', math.inf), icmp('192.0.2.4', 5.0))
+    model.sort('avg_ping')
+    assert shown(model)[:2] == ['192.0.2.4', '192.0.2.2'] and set(shown(model)[2:]) == {'192.0.2.1', '192.0.2.3'}
+    model.sort('avg_ping', reverse=True)
+    assert shown(model)[-2:] == ['192.0.2.2', '192.0.2.4']
+
+def test_dns_server_sorts_addresses_numerically_before_names():
+    model = model_of(icmp('dns.google', 1.0), icmp('192.0.2.10', 1.0), icmp('2001:db8::1', 1.0), icmp('192.0.2.9', 1.0))
+    model.sort('dns_server')
+    assert shown(model) == ['192.0.2.9', '192.0.2.10', '2001:db8::1', 'dns.google']
+
+def test_display_values_of_an_icmp_row():
+    model = model_of(icmp('192.0.2.1', 12.345), icmp('192.0.2.2', None, 100))
+    assert model.display_values(model.row_at(0), "Timeout") == ('192.0.2.1', '12.35', '0%', 'N/A', 'N/A', '-', '-', '-', '-', '-')
+    assert model.display_values(model.row_at(1), "Timeout")[1:3] == ('Timeout', '100%')
+
+def test_display_values_of_encrypted_rows():
+    timing = dnscheck.TLSTiming(1.234, 5.678, 9.0, 3.0, False)
+    model = model_of(('192.0.2.1', 3.0, 0, 'DE', 'Example', timing, 'NOERROR', 4),
+                     ('192.0.2.2', None, 100, 'DE', 'Example', None, 'REFUSED', 0),
+                     ('192.0.2.3', 3.0, 0, 'DE', 'Example', [None, None, None, 3.0, None], 'NOERROR', 4))
+    assert model.display_values(model.row_at(0), "Timeout") == ('192.0.2.1', '3.00', '0%', 'DE', 'Example', 'NOERROR', 4, '1.23', '5.68', '9.00')
+    assert model.display_values(model.row_at(1), "Timeout")[5:] == ('REFUSED', 0, '-', '-', '-')
+    # Sharded results carry the timing as a JSON list; a probe on a kept connection has no connect/handshake times.
+    assert model.display_values(model.row_at(2), "Timeout")[7:] == ('-', '-', '-')
@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+import pytest
+
+import dnscheck
+
+@pytest.fixture
+def store(tmp_path):
+    store = dnscheck.ResultStore(str(tmp_path / 'history.sqlite3'))
+    yield store
+    store.close()
+
+def test_fresh_result_serves_recent_successes_only(store):
+    store.record(('192.0.2.1', 12.5, 0, 'DE', 'Example'))
+    store.record(('192.0.2.2', None, 100, 'DE', 'Example'))
+    store.record(('192.0.2.3', 20.0, 0, 'DE', 'Example'), ts=time.time() - 7200)
+    cached = store.fresh_result('192.0.2.1', 3600)
+    assert isinstance(cached, dnscheck.CachedResult) and tuple(cached) == ('192.0.2.1', 12.5, 0, 'DE', 'Example')
+    assert store.fresh_result('192.0.2.2', 3600) is None  # failed
+    assert store.fresh_result('192.0.2.3', 3600) is None  # stale
+    assert store.fresh_result('192.0.2.4', 3600) is None  # never probed
+
+def test_results_are_kept_per_probe_mode(store):
+    store.record(('192.0.2.1', 12.5, 0, 'DE', 'Example'), 'icmp')
+    store.record(('192.0.2.1', 40.0, 25, 'DE', 'Example'), 'dot')
+    assert store.fresh_result('192.0.2.1', 3600, 'dns') is None
+    assert store.fresh_result('192.0.2.1', 3600, 'dot')[1] == 40.0
+    assert [row[-1] for row in store.latest()] == ['icmp', 'dot']
+    assert [row[1] for row in store.latest('icmp')] == [12.5]
+    assert {row[-1]: row[1] for row in store.summary()} == {'dot': 1, 'icmp': 1}
+    assert [row[1] for row in store.history('192.0.2.1', mode='dot')] == [40.0]
+
+def test_incremental_scan_skips_fresh_resolvers(store):
+    store.record(('192.0.2.1', 12.5, 0, 'DE', 'Example'), 'icmp')
+    scanner = dnscheck.DNSScanner(probe_mode='icmp', store=store); scanner.incremental_ttl = 3600; scanner.test_running = True
+    try: results = list(scanner.scan(['192.0.2.1']))
+    finally: scanner.store = None; scanner.close()
+    assert len(results) == 1 and isinstance(results[0], dnscheck.CachedResult)
+
+def test_databases_without_a_mode_column_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.sqlite3'); db = sqlite3.connect(path)
+    db.execute("CREATE TABLE probes (dns TEXT NOT NULL, ts REAL NOT NULL, ping REAL, loss INTEGER, location TEXT, isp TEXT)")
+    db.execute("CREATE TABLE latest (dns TEXT PRIMARY KEY, ts REAL NOT NULL, ping REAL, loss INTEGER, location TEXT, isp TEXT)")
+    row = ('192.0.2.1', time.time(), 12.5, 0, 'DE', 'Example')
+    db.execute("INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?)", row); db.execute("INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?)", row)
+    db.commit(); db.close()
+    store = dnscheck.ResultStore(path)
+    try:
+        assert store.fresh_result('192.0.2.1', 3600, 'icmp')[1] == 12.5
+        store.record(('192.0.2.1', 30.0, 0, 'DE', 'Example'), 'dns')
+        assert sorted(row[-1] for row in store.latest()) == ['dns', 'icmp']
+    finally: store.close()
+
+def test_unusable_database_path_raises_sqlite_error(tmp_path):
+    with pytest.raises(sqlite3.Error): dnscheck.ResultStore(str(tmp_path / 'missing' / 'history.sqlite3'))
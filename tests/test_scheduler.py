@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+import dnscheck
+
+async def echo_probe(target):
+    await asyncio.sleep(0.01)
+    return (target, 1.0, 0, 'N/A', 'N/A')
+
+def test_runs_every_target():
+    async def main(): return [result[0] async for result in dnscheck.ScanScheduler(echo_probe).run(range(200))]
+    assert sorted(asyncio.run(main())) == list(range(200))
+
+def test_pause_holds_back_new_probes_until_resume():
+    started = []
+    async def probe(target): started.append(target); return await echo_probe(target)
+    async def main():
+        scheduler = dnscheck.ScanScheduler(probe); scheduler.pause()
+        results = scheduler.run(range(10)); collecting = asyncio.ensure_future(results.__anext__())
+        await asyncio.sleep(0.05)
+        assert started == [] and not collecting.done()
+        scheduler.resume(); first = await collecting
+        rest = [result async for result in results]
+        return [first] + rest
+    assert len(asyncio.run(main())) == 10 and len(started) == 10
+
+def test_cancel_stops_in_flight_probes():
+    cancelled = []
+    async def probe(target):
+        try: await asyncio.sleep(10)
+        except asyncio.CancelledError: cancelled.append(target); raise
+    async def main():
+        scheduler = dnscheck.ScanScheduler(probe, window=8); results = scheduler.run(range(100))
+        collecting = asyncio.ensure_future(results.__anext__())
+        await asyncio.sleep(0.05); scheduler.cancel()
+        try: await asyncio.wait_for(collecting, 1)
+        except StopAsyncIteration: pass
+        return scheduler
+    scheduler = asyncio.run(main())
+    assert scheduler.in_flight == 0 and len(cancelled) == 8
+
+def test_feeder_keeps_the_loop_running_while_the_source_blocks():
+    # A source blocked like stdin waiting for input must not stall the loop, and its targets still get probed once it
+    # carries on.
+    release = threading.Event()
+    def source():
+        yield 'first'
+        release.wait(5)
+        yield 'second'
+    async def main():
+        scheduler = dnscheck.ScanScheduler(echo_probe)
+        feeder = dnscheck.TargetFeeder(source(), asyncio.get_running_loop())
+        results = scheduler.run(feeder); feeder.start(scheduler)
+        started = time.perf_counter(); first = await results.__anext__(); await asyncio.sleep(0.05)
+        responsive = time.perf_counter() - started < 1
+        release.set()
+        rest = [result async for result in results]
+        return [first] + rest, responsive
+    results, responsive = asyncio.run(main())
+    assert responsive and [result[0] for result in results] == ['first', 'second']
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import dnscheck
+
+def test_coordinator_gives_up_when_every_local_worker_keeps_crashing(tmp_path):
+    # The workers fail on the missing CA file at startup; the coordinator must not wait for them forever.
+    process = subprocess.run([sys.executable, dnscheck.LAUNCHER, 'scan', '-', '--shards', '2', '--dot', '--tls-ca', os.fspath(tmp_path / 'missing.pem'),
+                              '--no-history'], input='127.0.0.1\n', capture_output=True, text=True, timeout=60)
+    assert process.returncode == 1
+    assert process.stderr.strip().splitlines()[-1].startswith("Sharded scan failed:")
+
+def sharded(*arguments, targets='127.0.0.1-20\n'):
+    process = subprocess.run([sys.executable, dnscheck.LAUNCHER, 'scan', '-', '--no-history', '--shard-size', '3'] + list(arguments),
+                             input=targets, capture_output=True, text=True, timeout=60)
+    assert process.returncode == 0, process.stderr
+    return [json.loads(line)['dns'] for line in process.stdout.splitlines()]
+
+def test_local_workers_results_are_merged_once_each():
+    assert sorted(sharded('--shards', '2')) == sorted(f"127.0.0.{n}" for n in range(1, 21))
+
+def test_local_workers_connect_to_a_specific_listen_address():
+    # 127.0.0.2 is loopback too, but nothing listens on 127.0.0.1 for the workers to fall back on.
+    assert len(sharded('--shards', '2', '--listen', '127.0.0.2:0')) == 20
+
+def test_unfinished_shards_of_a_dropped_worker_are_requeued():
+    async def hello(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'{"hello": "test", "token": "secret"}\n'); await reader.readline()
+        return reader, writer
+    async def main():
+        targets = [f"192.0.2.{n}" for n in range(1, 7)]
+        coordinator = dnscheck.ShardCoordinator(targets, {'max_in_flight': 2}, 'secret', shard_size=2)
+        port = await coordinator.start('127.0.0.1', 0)
+        # The first worker takes two shards, reports one result and drops its connection.
+        reader, writer = await hello(port)
+        shard = json.loads(await reader.readline()); json.loads(await reader.readline())
+        writer.write(json.dumps({'shard': shard['shard'], 'result': [shard['targets'][0], 1.0, 0, 'N/A', 'N/A']}).encode() + b"\n")
+        await writer.drain(); writer.close()
+        while len(coordinator.requeued) < 2: await asyncio.sleep(0.01)
+        # The second worker finishes everything it is handed.
+        reader, writer = await hello(port); handed = []
+        while True:
+            message = json.loads(await reader.readline())
+            if message.get('done'): break
+            handed.extend(message['targets'])
+            for dns_ip in message['targets']: writer.write(json.dumps({'shard': message['shard'], 'result': [dns_ip, 1.0, 0, 'N/A', 'N/A']}).encode() + b"\n")
+            writer.write(json.dumps({'shard_done': message['shard']}).encode() + b"\n"); await writer.drain()
+        writer.close(); coordinator.close(); results = []
+        while (result := await coordinator.results.get()) is not None: results.append(result[0])
+        return targets, handed, results
+    targets, handed, results = asyncio.run(main())
+    assert handed == targets[1:]
+    assert sorted(results) == targets
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import dnscheck
+
+
+def test_scan_of_an_empty_input_starts_nothing():
+    # The loop, asyncio and the ICMP sockets wait for the first target, so `scan` starts as fast as `--help`.
+    code = "import sys, dnscheck; dnscheck.run_cli(['scan', '-', '--no-history']); print(sorted({'asyncio', 'ssl'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(dnscheck.LAUNCHER), stdin=subprocess.DEVNULL,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+# Wall-clock budgets depend on the machine and its load, so this only runs on request: DNSCHECK_STARTUP_BENCH=1 pytest
+@pytest.mark.skipif(not os.environ.get('DNSCHECK_STARTUP_BENCH'), reason="set DNSCHECK_STARTUP_BENCH=1 to check the startup budgets")
+def test_headless_commands_start_within_budget():
+    report = dnscheck.run_startup_benchmark(runs=5)
+    for name, run in report['commands'].items():
+        assert run['best_ms'] <= run['budget_ms'], f"{name} took {run['best_ms']} ms to start (budget {run['budget_ms']} ms)"
+        if run['peak_rss_kb'] is not None:
+            assert run['peak_rss_kb'] <= dnscheck.STARTUP_RSS_BUDGET_MB * 1024, f"{name} peaked at {run['peak_rss_kb']} KiB"
@@ -0,0 +1,42 @@
+import dnscheck
+
+def targets(*lines, **kwargs): return list(dnscheck.iter_targets(lines, **kwargs))
+
+def test_parses_addresses_names_networks_and_ranges():
+    parsed = targets("# resolvers", "1.1.1.1, 8.8.8.8 ; dns.google.  # trailing comment", "2001:DB8::1")
+    assert parsed == ['1.1.1.1', '8.8.8.8', 'dns.google', '2001:db8::1']
+    assert targets("192.0.2.0/30") == ['192.0.2.1', '192.0.2.2']  # no network or broadcast address
+    assert targets("192.0.2.8/31", "192.0.2.20/32") == ['192.0.2.8', '192.0.2.9', '192.0.2.20']
+    assert targets("10.0.0.5-7", "10.0.0.254-10.0.1.1") == ['10.0.0.5', '10.0.0.6', '10.0.0.7', '10.0.0.254', '10.0.0.255', '10.0.1.0', '10.0.1.1']
+    assert targets("2001:db8::/126") == ['2001:db8::', '2001:db8::1', '2001:db8::2', '2001:db8::3']
+
+def test_deduplicates_across_lines_and_formats():
+    assert targets("192.0.2.1", "192.0.2.0/30", "192.0.2.2-3", "DNS.Google", "dns.google.") == ['192.0.2.1', '192.0.2.2', '192.0.2.3', 'dns.google']
+    assert targets("192.0.2.1", "192.0.2.1", dedupe=False) == ['192.0.2.1', '192.0.2.1']
+
+def test_reports_bad_tokens_and_oversized_networks_and_carries_on():
+    errors = []
+    result = targets("not_an_ip!", "10.0.0.9-10.0.0.1", "10.0.0.0/8", "192.0.2.1", max_expansion=1024,
+                     on_error=lambda line_no, token, reason: errors.append((line_no, token)))
+    assert result == ['192.0.2.1']
+    assert errors == [(1, 'not_an_ip!'), (2, '10.0.0.9-10.0.0.1'), (3, '10.0.0.0/8')]
+
+def test_expansion_is_lazy():
+    stream = dnscheck.iter_targets(["10.0.0.0/8"])
+    assert [next(stream) for _ in range(3)] == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+
+def test_target_set_switches_dense_buckets_to_a_bitmap():
+    seen = dnscheck.TargetSet(); base = int(dnscheck.ipaddress.IPv4Address('10.1.0.0'))
+    assert all(seen.add(4, base + offset) for offset in range(dnscheck.TargetSet.DENSE_THRESHOLD + 10))
+    assert isinstance(seen.ipv4[base >> 16], bytearray)
+    assert not seen.add(4, base + 5) and seen.add(4, base + 60000) and not seen.add(4, base + 60000)
+    assert seen.add(6, 1) and not seen.add(6, 1) and seen.add_name('dns.google') and not seen.add_name('dns.google')
+
+def test_count_matches_the_expanded_targets():
+    lines = ["192.0.2.0/28 192.0.2.5-20", "192.0.2.30-31, 10.0.0.0/24", "2001:db8::/126 2001:db8::1", "DNS.google dns.google. not_an_ip!", "10.0.0.128/25"]
+    assert dnscheck.count_targets(lines) == len(targets(*lines, on_error=lambda *args: None))
+    assert dnscheck.count_targets(lines, dedupe=False) == len(targets(*lines, dedupe=False, on_error=lambda *args: None))
+    assert dnscheck.count_targets(["10.0.0.0/8"], max_expansion=1024) == 0
+
+def test_count_does_not_expand_networks():
+    assert dnscheck.count_targets(["10.0.0.0/8", "10.1.0.0/16", "2001:db8::/104"]) == (1 << 24) - 2 + (1 << 24)
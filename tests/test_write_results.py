@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+import pytest
+
+import dnscheck
+
+TIMING = dnscheck.TLSTiming(1.234, 5.678, 9.0, 3.0, True)
+RESULTS = {
+    'icmp': [('192.0.2.1', 12.345, 0, 'DE', 'Example'), ('192.0.2.2', None, 100, 'N/A', 'N/A')],
+    'dns': [('192.0.2.1', 12.345, 0, 'DE', 'Example', None, 'NOERROR', 4), ('192.0.2.2', None, 100, 'N/A', 'N/A', None, 'REFUSED', 0)],
+    # A probe that never connected has no timing; a sharded result carries it as the JSON list a worker sent.
+    'dot': [('192.0.2.1', 3.0, 0, 'DE', 'Example', TIMING, 'NOERROR', 4), ('192.0.2.2', None, 100, 'N/A', 'N/A', None, None, 0),
+            ('192.0.2.3', 3.0, 0, 'DE', 'Example', [None, None, None, 3.0, False], 'NOERROR', 4)],
+}
+COLUMNS = {'icmp': dnscheck.RESULT_FIELDS, 'dns': dnscheck.RESULT_FIELDS + dnscheck.DNS_FIELDS,
+           'dot': dnscheck.RESULT_FIELDS + dnscheck.DNS_FIELDS + dnscheck.TIMING_FIELDS}
+
+def written(probe_mode, file_format, results=None):
+    out = io.StringIO()
+    assert dnscheck.write_results(iter(results or RESULTS[probe_mode]), out, file_format, probe_mode) == len(results or RESULTS[probe_mode])
+    return out.getvalue()
+
+@pytest.mark.parametrize('probe_mode', COLUMNS)
+def test_every_row_has_the_columns_of_its_probe_mode(probe_mode):
+    rows = list(csv.reader(io.StringIO(written(probe_mode, 'csv'))))
+    assert tuple(rows[0]) == COLUMNS[probe_mode] and all(len(row) == len(COLUMNS[probe_mode]) for row in rows[1:])
+    records = [json.loads(line) for line in written(probe_mode, 'ndjson').splitlines()]
+    assert all(tuple(record) == COLUMNS[probe_mode] for record in records)
+
+def test_ndjson_values():
+    success, timeout = [json.loads(line) for line in written('dns', 'ndjson').splitlines()]
+    assert success == {'dns': '192.0.2.1', 'ping': 12.35, 'loss': 0, 'location': 'DE', 'isp': 'Example', 'rcode': 'NOERROR', 'answers': 4}
+    assert timeout['ping'] is None and timeout['rcode'] == 'REFUSED' and timeout['answers'] == 0
+
+def test_dot_timings():
+    full, unconnected, sharded = [json.loads(line) for line in written('dot', 'ndjson').splitlines()]
+    assert [full[field] for field in dnscheck.TIMING_FIELDS] == [1.23, 5.68, 9.0, 3.0, True]
+    assert all(unconnected[field] is None for field in dnscheck.TIMING_FIELDS) and unconnected['rcode'] is None
+    assert [sharded[field] for field in dnscheck.TIMING_FIELDS] == [None, None, None, 3.0, False]
+    _, full, unconnected, sharded = csv.reader(io.StringIO(written('dot', 'csv')))
+    assert full[5:] == ['NOERROR', '4', '1.23', '5.68', '9.0', '3.0', 'True']
+    assert unconnected[1:] == ['', '100', 'N/A', 'N/A', '', '0', '', '', '', '', '']
+    assert sharded[7:] == ['', '', '', '3.0', 'False']
+
+def test_icmp_csv_values():
+    _, success, timeout = csv.reader(io.StringIO(written('icmp', 'csv')))
+    assert success == ['192.0.2.1', '12.35', '0', 'DE', 'Example'] and timeout == ['192.0.2.2', '', '100', 'N/A', 'N/A']